@@ -0,0 +1,94 @@
+import argparse
+import json
+import subprocess
+from pathlib import Path
+
+from loguru import logger
+
+from benchmarks.bench_e2e import bench_e2e
+from benchmarks.bench_hot_path import bench_parse, bench_prepare, bench_wake_up
+from benchmarks.bench_logging import bench_logging
+from benchmarks.bench_match import bench_match
+from benchmarks.bench_schedule import bench_diff
+
+BENCHMARKS = {
+    "match": bench_match,
+    "prepare": bench_prepare,
+    "parse": bench_parse,
+    "wake_up": bench_wake_up,
+    "logging": bench_logging,
+    "diff": bench_diff,
+    "e2e": bench_e2e,
+}
+
+RESULTS = Path(__file__).parent / "results"
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(names: list[str]) -> dict:
+    """
+    Run the named benchmarks with log records formatted but discarded, so
+    logging costs what it would in a real run without flooding stdout.
+
+    Returns:
+        dict: All results by name.
+    """
+    logger.remove()
+    handler_id = logger.add(lambda message: None, level="DEBUG")
+    results = {}
+    try:
+        for name in names:
+            results.update(BENCHMARKS[name]())
+    finally:
+        logger.remove(handler_id)
+    return results
+
+
+def compare(results: dict, baseline: dict) -> None:
+    for key, value in results.items():
+        old = baseline.get(key)
+        change = f"{(value / old - 1) * 100:+7.1f} %" if old else ""
+        print(f"{key:<22} {value:12.6f} {change}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the booking hot path"
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help=f"Benchmarks to run, all by default: {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="COMMIT",
+        help="Compare with the stored results of a commit",
+    )
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    results = run(args.names or list(BENCHMARKS))
+
+    baseline = {}
+    if args.compare:
+        baseline = json.loads((RESULTS / f"{args.compare}.json").read_text())
+    compare(results, baseline)
+
+    RESULTS.mkdir(exist_ok=True)
+    path = RESULTS / f"{_commit()}.json"
+    path.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Stored in {path}")
@@ -0,0 +1,60 @@
+import datetime
+import statistics
+import time
+
+import requests
+
+from book_feelgood.book import Feelgood_Activity, _login, _post_bookings
+from book_feelgood.metrics import Timings
+from book_feelgood.standin import Feelgood_Standin
+
+
+def bench_e2e(bookings: int = 3, rounds: int = 10) -> dict:
+    """
+    Book against a local stand-in server released at a fixed instant and
+    measure how long after the release the bookings reach the server.
+
+    Returns:
+        dict: Median and max seconds from release to the last booking
+            arriving, and median seconds from release to all answers.
+    """
+    arrivals = []
+    answers = []
+    with Feelgood_Standin() as standin:
+        urls = standin.urls
+        start = f"{datetime.date.today()} 15:00:00"
+        with requests.session() as s:
+            _login(s, urls, "bench@feelgood.se", "pw")
+            for i in range(rounds):
+                activities = []
+                for j in range(bookings):
+                    activity_id = f"{i}_{j}"
+                    standin.add_activity(activity_id, "Badminton", start)
+                    activities.append(
+                        Feelgood_Activity(
+                            f"{urls['base_url']}{urls['participate']}"
+                            f"{activity_id}",
+                            "Badminton",
+                            start,
+                        )
+                    )
+                del standin.requests[:]
+                timings = Timings()
+                released = time.time()
+                _post_bookings(
+                    False,
+                    {},
+                    s,
+                    activities,
+                    release_time=None,
+                    timings=timings,
+                )
+                arrivals.append(
+                    max(t for t, _, _ in standin.requests) - released
+                )
+                answers.append(time.time() - released)
+    return {
+        "e2e_arrival_median": statistics.median(arrivals),
+        "e2e_arrival_max": max(arrivals),
+        "e2e_answers_median": statistics.median(answers),
+    }
@@ -0,0 +1,81 @@
+import datetime
+import statistics
+import time
+import timeit
+
+import requests
+from requests.models import Response
+
+from book_feelgood.book import (
+    Feelgood_Activity,
+    _parse_booking,
+    _prepare_bookings,
+    _sleep_until,
+)
+
+
+def _activities(count: int) -> list[Feelgood_Activity]:
+    start = f"{datetime.date.today()} 09:00:00"
+    return [
+        Feelgood_Activity(
+            f"https://dummy.com/w_booking/activities/participate/id_{i}",
+            "Boka sporthallen 30min" if i % 2 else "Badminton",
+            start,
+            "09:30",
+        )
+        for i in range(count)
+    ]
+
+
+def bench_prepare(count: int = 3, number: int = 2000) -> dict:
+    """
+    Time building, encoding and preparing count booking requests.
+
+    Returns:
+        dict: Seconds per call.
+    """
+    s = requests.session()
+    activities = _activities(count)
+    headers = {"accept": "application/json"}
+    seconds = timeit.timeit(
+        lambda: _prepare_bookings(s, headers, activities), number=number
+    )
+    return {"prepare": seconds / number}
+
+
+def bench_parse(number: int = 5000) -> dict:
+    """
+    Time parsing an ok and a full booking response.
+
+    Returns:
+        dict: Seconds per call for each response.
+    """
+    [fa] = _activities(1)
+    results = {}
+    for name, body in (
+        ("parse_ok", b'{"result": "ok"}'),
+        ("parse_full", b'{"error_code": "ACTIVITY_FULL"}'),
+    ):
+        r = Response()
+        r.status_code = 200
+        r._content = body
+        seconds = timeit.timeit(lambda: _parse_booking((r, fa)), number=number)
+        results[name] = seconds / number
+    return results
+
+
+def bench_wake_up(samples: int = 50, sleep: float = 0.05) -> dict:
+    """
+    Measure how late _sleep_until returns after its deadline.
+
+    Returns:
+        dict: Median, 95th percentile and max jitter in seconds.
+    """
+    jitters = sorted(
+        _sleep_until(time.perf_counter() + sleep) for _ in range(samples)
+    )
+    return {
+        "wake_up_median": statistics.median(jitters),
+        "wake_up_p95": jitters[int(0.95 * (samples - 1))],
+        "wake_up_max": jitters[-1],
+    }
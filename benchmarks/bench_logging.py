@@ -0,0 +1,37 @@
+import timeit
+
+from loguru import logger
+
+from benchmarks.bench_hot_path import _activities
+from book_feelgood.logbuffer import Log_Buffer
+
+
+def bench_logging(count: int = 3, number: int = 2000) -> dict:
+    """
+    Time the log calls made for count bookings in the release window,
+    formatted right away as before and stored in a Log_Buffer as now, and
+    the flush of the buffer once the window is over.
+
+    Returns:
+        dict: Seconds per round of count log calls.
+    """
+    activities = _activities(count)
+
+    def eager():
+        for activity in activities:
+            logger.info(f"Attempts: {1}, {activity.summary()}")
+
+    buffer = Log_Buffer()
+
+    def buffered():
+        for activity in activities:
+            buffer.info("Attempts: {}, {}", 1, activity.summary)
+
+    eager_seconds = timeit.timeit(eager, number=number)
+    buffered_seconds = timeit.timeit(buffered, number=number)
+    flush_seconds = timeit.timeit(buffer.flush, number=1)
+    return {
+        "log_eager": eager_seconds / number,
+        "log_buffered": buffered_seconds / number,
+        "log_flush": flush_seconds / number,
+    }
@@ -0,0 +1,107 @@
+import datetime
+import random
+import timeit
+
+from loguru import logger
+
+from book_feelgood.book import _match_yml_activity_to_remote
+
+URLS = {
+    "base_url": "https://dummy.com/",
+    "participate": "w_booking/activities/participate/",
+}
+
+NAMES = [
+    "Badminton",
+    "Boka sporthallen 30min",
+    "Cirkelträning",
+    "Spinning",
+    "Yoga",
+    "Pilates",
+    "Core",
+    "Bodypump",
+]
+
+
+def synthetic_activities(count: int, seed: int = 0) -> dict:
+    """
+    Create a feelgood activity list with count activities spread over a
+    week, every 5 minutes between 06:00 and 22:00.
+    """
+    rng = random.Random(seed)
+    monday = datetime.datetime(2024, 3, 4)
+    activities = []
+    for i in range(count):
+        start = monday + datetime.timedelta(
+            days=rng.randrange(7),
+            minutes=6 * 60 + 5 * rng.randrange(16 * 12),
+        )
+        activities.append(
+            {
+                "ActivityType": {"name": rng.choice(NAMES)},
+                "Activity": {
+                    "id": f"id_{i}",
+                    "start": start.strftime("%Y-%m-%d %H:%M:%S"),
+                },
+            }
+        )
+    return {"activities": activities}
+
+
+def synthetic_yml_acts(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "name": rng.choice(NAMES),
+            "time": f"{rng.randrange(6, 22):02d}:{5 * rng.randrange(12):02d}",
+        }
+        for _ in range(count)
+    ]
+
+
+def naive_match(yml_acts: list[dict], feelgood_activities: dict) -> list:
+    """
+    The nested loop matching the index replaced, kept as reference.
+    """
+    matches = []
+    for f_act in feelgood_activities["activities"]:
+        for yml_act in yml_acts:
+            if (
+                yml_act["name"] in f_act["ActivityType"]["name"]
+                and yml_act["time"] in f_act["Activity"]["start"]
+            ):
+                matches.append(f_act["Activity"]["id"])
+    return matches
+
+
+def bench_match(
+    activities: int = 5000,
+    yml_acts: int = 50,
+    number: int = 20,
+) -> dict:
+    """
+    Time the nested loop against the indexed matching.
+
+    Returns:
+        dict: Seconds per call for both and the speedup.
+    """
+    feelgood_activities = synthetic_activities(activities)
+    acts = synthetic_yml_acts(yml_acts)
+    logger.disable("book_feelgood")
+    try:
+        naive = timeit.timeit(
+            lambda: naive_match(acts, feelgood_activities), number=number
+        )
+        indexed = timeit.timeit(
+            lambda: _match_yml_activity_to_remote(
+                URLS, acts, feelgood_activities
+            ),
+            number=number,
+        )
+    finally:
+        logger.enable("book_feelgood")
+    return {
+        "match_naive": naive / number,
+        "match_indexed": indexed / number,
+        "match_speedup": naive / indexed,
+    }
@@ -0,0 +1,45 @@
+import copy
+import random
+import timeit
+
+from benchmarks.bench_match import synthetic_activities
+from book_feelgood.schedule import Schedule_Snapshot
+
+
+def _next_fetch(feelgood_activities: dict, seed: int = 0) -> dict:
+    """
+    The same list a poll later, with a few bookings and a cancellation.
+    """
+    rng = random.Random(seed)
+    newer = copy.deepcopy(feelgood_activities)
+    for f_act in rng.sample(newer["activities"], 5):
+        f_act["Activity"]["participants"] = 1
+    newer["activities"].pop(rng.randrange(len(newer["activities"])))
+    return newer
+
+
+def bench_diff(
+    sizes: tuple[int, ...] = (1000, 10000), number: int = 20
+) -> dict:
+    """
+    Time diffing two fetches of lists of growing size, the time per
+    activity should stay flat as the diff is linear.
+
+    Returns:
+        dict: Seconds per activity for each size.
+    """
+    results = {}
+    for size in sizes:
+        first = synthetic_activities(size)
+        for f_act in first["activities"]:
+            f_act["Activity"]["max_participants"] = 1
+            f_act["Activity"]["participants"] = 0
+        second = _next_fetch(first)
+
+        def diff():
+            snapshot = Schedule_Snapshot(first)
+            snapshot.update(second)
+
+        seconds = timeit.timeit(diff, number=number)
+        results[f"diff_{size}"] = seconds / number / size
+    return results
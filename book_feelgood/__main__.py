@@ -1,5 +1,13 @@
-from book_feelgood.book import book
-from book_feelgood.parse import initialize_parser
+import sys
+
+from book_feelgood.parse import initialize_multi_parser, initialize_parser
 
 if __name__ == "__main__":
-    book(**initialize_parser())
+    if sys.argv[1:2] == ["serve"]:
+        from book_feelgood.serve import serve
+
+        serve(**initialize_multi_parser(sys.argv[2:]))
+    else:
+        from book_feelgood.book import book
+
+        book(**initialize_parser())
@@ -1,33 +1,100 @@
+from __future__ import annotations
+
+import codecs
 import datetime
+import email.utils
+import json
+import math
 import random
+import re
+import statistics
 import sys
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Iterable, Iterator
 
-import requests
 from loguru import logger
 
+from book_feelgood.cache import Activity_Cache
+from book_feelgood.logbuffer import Log_Buffer
+from book_feelgood.metrics import Timings
 from book_feelgood.parse import (
+    compile_activities,
     get_date,
+    lazy_import,
+    load_activities,
     load_config,
     log_dict,
     parse_day,
-    read_yaml,
+    parse_day_offset,
     splash,
 )
 
+# requests is the slowest import by far, only pay for it once it is used
+requests = lazy_import("requests")
+
+if TYPE_CHECKING:
+    from book_feelgood.sessions import Session_Store
+
 
 class Feelgood_Activity:
+    __slots__ = ("_url", "_name", "_start", "_start_time", "_group", "_rank")
+
     def __init__(
         self,
         url: str,
         name: str,
         start: str,
         start_time="0",
+        group: int = None,
+        rank: int = 0,
     ) -> None:
         self._url = url
         self._name = name
         self._start = start
         self._start_time = start_time
+        self._group = group
+        self._rank = rank
+
+    @classmethod
+    def from_remote(
+        cls,
+        f_act: dict,
+        urls: dict,
+        start_time="0",
+        group: int = None,
+        rank: int = 0,
+    ) -> Feelgood_Activity:
+        """
+        Create the activity from its record in feelgood's activity list.
+
+        Args:
+            f_act (dict): The activity record as returned by feelgood.
+            urls (dict): Dictionary containing base and participation URLs.
+            start_time (optional): Start time for Boka activities.
+                Defaults to "0".
+            group (int, optional): The YAML activity this is one of the
+                alternatives of, at most one of them is kept booked.
+                Defaults to None, no alternatives.
+            rank (int, optional): Preference within the group, 0 for the
+                primary. Defaults to 0.
+
+        Returns:
+            Feelgood_Activity: The activity, booked through its own url.
+        """
+        return cls(
+            url=(
+                f"{urls['base_url']}"
+                f"{urls['participate']}"
+                f"{f_act['Activity']['id']}"
+            ),
+            name=f_act["ActivityType"]["name"],
+            start=f_act["Activity"]["start"],
+            start_time=start_time,
+            group=group,
+            rank=rank,
+        )
 
     @property
     def url(self):
@@ -45,6 +112,22 @@ class Feelgood_Activity:
     def start_time(self):
         return self._start_time
 
+    @property
+    def id(self) -> str:
+        return self.url.rpartition("/")[2]
+
+    @property
+    def group(self):
+        return self._group
+
+    @property
+    def rank(self):
+        return self._rank
+
+    @property
+    def date(self) -> datetime.date:
+        return datetime.date.fromisoformat(self.start[:10])
+
     @start_time.setter
     def start_time(self, start_time):
         self._start_time = start_time
@@ -61,7 +144,19 @@ class Feelgood_Activity:
         )
 
     def __eq__(self, __value: object) -> bool:
-        return bool(str(self) == str(__value))
+        if not isinstance(__value, Feelgood_Activity):
+            return NotImplemented
+        return (
+            self._url == __value._url
+            and self._name == __value._name
+            and self._start == __value._start
+            and self._start_time == __value._start_time
+        )
+
+    def __hash__(self) -> int:
+        # start_time is left out as it can be set after the activity is
+        # hashed, equal activities still get equal hashes
+        return hash((self._url, self._name, self._start))
 
 
 def book(
@@ -103,15 +198,16 @@ def book(
         logger.info("---running as test, no booking will be made---")
     activities = None
     if activities_file:
-        activities = read_yaml(f"activities/{activities_file}.yml")
+        activities = load_activities(f"activities/{activities_file}.yml")
         logger.info(f"Using activities/{activities_file}.yml")
     else:
         if name and book_time and day:
             test_act = {"name": name, "time": book_time, "day": day}
             if start_time:
                 test_act["start_time"] = start_time
-            activities = {}
-            activities["activities"] = [test_act]
+            activities = compile_activities(
+                {"activities": [test_act]}, "manual activity"
+            )
         else:
             raise ValueError(
                 "To run manually you must at least specify: name, time and day"
@@ -120,118 +216,1247 @@ def book(
         logger.info("Manual activity:")
         log_dict(activities)
 
-    if not day_offset:
-        day_offset = settings["day_offset"]
+    timings = Timings()
+    code = _book_account(
+        username,
+        password,
+        activities,
+        test,
+        day_offset,
+        settings,
+        urls,
+        headers,
+        timings,
+    )
+    logger.debug(f"Timings: {timings.report()}")
+    if activities_file:
+        timings.write(f"logs/{activities_file}.timings.jsonl")
+    if code:
+        exit(code)
 
-    future_date = get_date(day_offset=int(day_offset))
-    # Check if date_next_week matches any config days
-    yml_acts = _return_matching_activities(activities, future_date)
 
-    if not yml_acts:
+def _book_account(
+    username: str,
+    password: str,
+    activities: dict,
+    test: bool,
+    day_offset: str,
+    settings: dict,
+    urls: dict,
+    headers: dict,
+    timings: Timings = None,
+) -> int:  # pragma: no cover
+    """
+    Run the login, list, book and logout pipeline for one account in its
+    own session.
+
+    Args:
+        username (str): The username for logging in.
+        password (str): The password for logging in.
+        activities (dict): The activities blob to book from.
+        test (bool): Flag indicating whether to run in test mode.
+        day_offset (str): The offset for the booking day, None to use the
+            one in settings.
+        settings (dict): The settings section of the config.
+        urls (dict): The urls section of the config.
+        headers (dict): The headers section of the config.
+        timings (Timings, optional): Collects the timings of the run.
+            Defaults to None.
+
+    Returns:
+        int: Exit code, 0 if the pipeline ran through.
+    """
+    timings = timings or Timings()
+    yml_by_date = _yml_by_date(
+        activities, day_offset or settings["day_offset"]
+    )
+    if not yml_by_date:
         logger.success("No activities to book today, bye!")
-        exit(0)
+        return 0
+
+    store = _session_store(settings)
+    s = requests.session()
+    with timings.phase("login"):
+        logged_in = _resume_or_login(s, urls, username, password, store)
+    if not logged_in:
+        s.close()
+        return 8123
+
+    _book_session(s, yml_by_date, test, settings, urls, headers, timings)
+
+    if store is not None:
+        # Stay logged in for the next run
+        store.save(username, password, s.cookies)
+        s.close()
+    else:
+        low, high = settings["logout_delay"]
+        _delayed_logout(s, urls, username, random.randint(low, high))
+
+    return 0
+
+
+def _yml_by_date(
+    activities: dict,
+    day_offset: int | str,
+) -> dict[datetime.date, list[dict]]:
+    """
+    Find the YAML activities taking place on each date to book.
+
+    Args:
+        activities (dict): The activities blob to book from.
+        day_offset (int | str): The offset, or range of offsets, of the
+            dates to book.
+
+    Returns:
+        dict[datetime.date, list[dict]]:
+            The YAML activities of each date that has any.
+    """
+    yml_by_date = {}
+    for offset in parse_day_offset(day_offset):
+        future_date = get_date(day_offset=offset)
+        yml_acts = _return_matching_activities(activities, future_date)
+        if yml_acts:
+            yml_by_date[future_date] = yml_acts
+    return yml_by_date
+
+
+def _login(
+    s: requests.session,
+    urls: dict,
+    username: str,
+    password: str,
+) -> bool:
+    """
+    Log in to feelgood with the session.
+
+    Returns:
+        bool: True if logging in succeeded.
+    """
+    payload = {"User": {"email": username, "password": password}}
+
+    r = s.post(f"{urls['base_url']}", json=payload)
+    if r.status_code == 200:
+        logger.success(f"Logged in: {username}")
+        return True
+    logger.error("Something went wrong with logging in, exiting...")
+    return False
 
-    with requests.session() as s:
-        get_activities_url = f"{urls['base_url']}{urls['list']}"
 
-        params = {
-            "from": future_date,
-            "to": future_date,
-            "today": 0,
-            "mine": 0,
-            "only_try_it": 0,
-            "facility": settings["facility"],
-        }
+def _session_store(settings: dict) -> Session_Store | None:
+    """
+    Get the store of login cookies, if enabled with session_cache.
 
-        payload = {"User": {"email": username, "password": password}}
+    Args:
+        settings (dict): The settings section of the config.
 
-        r = s.post(f"{urls['base_url']}", json=payload)
-        if r.status_code == 200:
-            logger.success(f"Logged in: {username}")
+    Returns:
+        Session_Store | None: The store, None if disabled or unavailable.
+    """
+    if not settings["session_cache"]:
+        return None
+    # cryptography is optional and slow to import, only load it when used
+    from book_feelgood.sessions import Session_Store
+
+    if not Session_Store.available():
+        logger.warning("session_cache needs cryptography, logging in instead")
+        return None
+    return Session_Store(settings["session_dir"])
+
+
+def _resume_or_login(
+    s: requests.session,
+    urls: dict,
+    username: str,
+    password: str,
+    store: Session_Store = None,
+) -> bool:
+    """
+    Resume the stored session of a username if it is still logged in,
+    otherwise log in with the credentials.
+
+    Args:
+        s (requests.session): The session to log in.
+        urls (dict): The urls section of the config.
+        username (str): The username for logging in.
+        password (str): The password for logging in.
+        store (Session_Store, optional): The stored login cookies.
+            Defaults to None, always log in.
+
+    Returns:
+        bool: True if the session is logged in.
+    """
+    if store is not None:
+        jar = store.load(username, password)
+        if jar is not None:
+            s.cookies.update(jar)
+            if _session_valid(s, urls):
+                logger.success(f"Resumed session: {username}")
+                return True
+            logger.info("Stored session has expired, logging in")
+            s.cookies.clear()
+            store.clear(username)
+    return _login(s, urls, username, password)
+
+
+def _session_valid(s: requests.session, urls: dict) -> bool:
+    """
+    Check with a cheap request if the session is logged in, a logged out
+    session is redirected to the login page instead.
+    """
+    try:
+        r = s.get(f"{urls['base_url']}{urls['home']}", allow_redirects=False)
+    except requests.RequestException as e:
+        logger.warning(f"Could not check the stored session: {e=}")
+        return False
+    return r.status_code == 200
+
+
+def _book_session(
+    s: requests.session,
+    yml_by_date: dict[datetime.date, list[dict]],
+    test: bool,
+    settings: dict,
+    urls: dict,
+    headers: dict,
+    timings: Timings = None,
+) -> None:  # pragma: no cover
+    """
+    Fetch the activity lists, match them and book the matches with an
+    already logged in session.
+
+    Args:
+        s (requests.session): The logged in session.
+        yml_by_date (dict[datetime.date, list[dict]]):
+            The YAML activities to book on each date.
+        test (bool): Flag indicating whether to run in test mode.
+        settings (dict): The settings section of the config.
+        urls (dict): The urls section of the config.
+        headers (dict): The headers section of the config.
+        timings (Timings, optional): Collects the timings of the run.
+            Defaults to None.
+    """
+    timings = timings or Timings()
+    get_activities_url = f"{urls['base_url']}{urls['list']}"
+
+    params = _list_params(
+        settings["facility"], min(yml_by_date), max(yml_by_date)
+    )
+
+    with timings.phase("list"):
+        refresh = None
+        if settings["stream_list"]:
+            # Only possible matches are kept, so there is nothing to cache
+            lists = _stream_activities(
+                s, get_activities_url, params, headers, yml_by_date
+            )
         else:
-            logger.error("Something went wrong with logging in, exiting...")
-            exit(8123)
-        r = s.get(get_activities_url, params=params, headers=headers)
-        feelgood_activities = r.json()
+            lists, refresh = _cached_activities(
+                s, get_activities_url, params, headers, settings, yml_by_date
+            )
 
-        activities_to_book = _match_yml_activity_to_remote(
-            urls,
-            yml_acts,
-            feelgood_activities,
+    with timings.phase("match"):
+        activities_to_book = _match_by_date(urls, yml_by_date, lists)
+    if refresh is not None and not activities_to_book:
+        # The cached lists may be missing a newly added activity
+        activities_to_book = _refreshed_matches(
+            refresh, urls, yml_by_date, activities_to_book
         )
+        refresh = None
 
-        if activities_to_book:
-            bookings = _post_bookings(
-                test,
-                headers,
-                future_date,
-                s,
-                activities_to_book,
+    # Dates before the booking horizon are already open, the horizon date
+    # opens at the release time and later dates can not be booked yet.
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    if activities_to_book:
+        lead = 0.0
+        if not test:
+            _mount_pool(s, urls["base_url"], len(activities_to_book))
+            with timings.phase("calibrate"):
+                offset, latency = _calibrate_clock(
+                    s,
+                    f"{urls['base_url']}{urls['home']}",
+                    samples=int(settings["clock_samples"]),
+                )
+            timings.set("clock_offset", offset)
+            timings.set("latency", latency)
+            lead = offset + latency
+        if refresh is not None:
+            activities_to_book = _refreshed_matches(
+                refresh, urls, yml_by_date, activities_to_book
             )
+        for activity_to_book in activities_to_book:
+            if activity_to_book.date > horizon:
+                logger.warning(f"Not bookable yet: {activity_to_book}")
+        bookings = _post_bookings(
+            test,
+            headers,
+            s,
+            [fa for fa in activities_to_book if fa.date < horizon],
+            release_time=None,
+            timings=timings,
+            fallback=settings["fallback"],
+        )
+        bookings += _post_bookings(
+            test,
+            headers,
+            s,
+            [fa for fa in activities_to_book if fa.date == horizon],
+            release_time=settings["release_time"],
+            lead=lead,
+            warm_url=f"{urls['base_url']}{urls['home']}",
+            warmup=float(settings["warmup_seconds"]),
+            retry_interval=settings["retry_interval"],
+            retry_window=float(settings["retry_window"]),
+            timings=timings,
+            fallback=settings["fallback"],
+        )
+        with timings.phase("parse"):
             for booking in bookings:
                 _parse_booking(booking)
+        _cancel_surplus(s, urls, headers, bookings)
+        _wait_for_spots(s, urls, headers, settings, timings, bookings)
+    else:
+        logger.warning("No matching activity was found.")
+
+
+def _wait_for_spots(
+    s: requests.session,
+    urls: dict,
+    headers: dict,
+    settings: dict,
+    timings: Timings,
+    bookings: list[tuple[requests.Response, Feelgood_Activity]],
+) -> None:
+    """
+    Watch the activities that were fully booked for waitlist_duration
+    seconds and book them when a spot frees up, see Waitlist.
+
+    Args:
+        s (requests.session): The logged in session.
+        urls (dict): The urls section of the config.
+        headers (dict): The headers section of the config.
+        settings (dict): The settings section of the config.
+        timings (Timings): Collects the timings of the run.
+        bookings (list[tuple[requests.Response, Feelgood_Activity]]):
+            The responses paired with their activity.
+    """
+    full = _full_activities(bookings)
+    if not full or float(settings["waitlist_duration"]) <= 0:
+        return
+    # Imported here as the waitlist builds on this module
+    from book_feelgood.waitlist import Waitlist
+
+    waitlist = Waitlist(s, urls, headers, settings["facility"], timings)
+    waitlist.watch(full)
+    for booking in waitlist.run(
+        float(settings["waitlist_duration"]),
+        float(settings["waitlist_poll"]),
+        float(settings["waitlist_jitter"]),
+    ):
+        _parse_booking(booking)
+
+
+def _list_params(
+    facility: str,
+    date_from: datetime.date,
+    date_to: datetime.date,
+) -> dict:
+    """
+    Query parameters for listing a facility's activities between two dates.
+    """
+    return {
+        "from": date_from,
+        "to": date_to,
+        "today": 0,
+        "mine": 0,
+        "only_try_it": 0,
+        "facility": facility,
+    }
+
+
+def _cached_activities(
+    s: requests.session,
+    url: str,
+    params: dict,
+    headers: dict,
+    settings: dict,
+    dates: list[datetime.date],
+) -> tuple[dict[datetime.date, dict], Future | None]:
+    """
+    Get the activity list of each date from the cache, fetching them if
+    any is missing. Stale lists are returned as they are while fresh ones
+    are fetched in the background.
+
+    Args:
+        s (requests.session): The logged in session.
+        url (str): The activity list url.
+        params (dict): The query parameters, facility and date range.
+        headers (dict): Headers to send with the request.
+        settings (dict): The settings section of the config.
+        dates (list[datetime.date]): The dates to get the lists of.
+
+    Returns:
+        tuple[dict[datetime.date, dict], Future | None]:
+            The activity list of each date, and the pending refresh of
+            them if they were stale.
+    """
+    cache, lists, fresh = _read_cache(settings, dates)
+    refresh = None
+    if None in lists.values():
+        lists = _fetch_activities(s, url, params, headers, cache, dates)
+    elif not fresh:
+        # Use the stale lists for now and fetch new ones meanwhile
+        executor = ThreadPoolExecutor(max_workers=1)
+        refresh = executor.submit(
+            _fetch_activities, s, url, params, headers, cache, dates
+        )
+        executor.shutdown(wait=False)
+    return lists, refresh
+
+
+def _read_cache(
+    settings: dict,
+    dates: list[datetime.date],
+) -> tuple[Activity_Cache, dict[datetime.date, dict | None], bool]:
+    """
+    Look up the activity list of each date in the cache, after evicting
+    the lists of past dates.
+
+    Args:
+        settings (dict): The settings section of the config.
+        dates (list[datetime.date]): The dates to get the lists of.
+
+    Returns:
+        tuple[Activity_Cache, dict[datetime.date, dict | None], bool]:
+            The cache, the cached list of each date, None where missing,
+            and whether all of them are fresh.
+    """
+    cache = Activity_Cache(settings["cache_dir"], int(settings["cache_ttl"]))
+    cache.evict(datetime.date.today())
+    lists = {}
+    fresh = True
+    for date in dates:
+        lists[date], date_fresh = cache.get(settings["facility"], date)
+        fresh = fresh and date_fresh
+    return cache, lists, fresh
+
+
+STREAM_CHUNK = 16 * 1024
+_ACTIVITIES_ARRAY = re.compile(r'"activities"\s*:\s*\[')
+
+
+def _stream_activities(
+    s: requests.session,
+    url: str,
+    params: dict,
+    headers: dict,
+    yml_by_date: dict[datetime.date, list[dict]],
+) -> dict[datetime.date, dict]:
+    """
+    Fetch the activity list and parse it while it is downloaded, keeping
+    only the remote activities that can match a YAML activity. The rest
+    is dropped as soon as it is parsed.
+
+    Args:
+        s (requests.session): The logged in session.
+        url (str): The activity list url.
+        params (dict): The query parameters, facility and date range.
+        headers (dict): Headers to send with the request.
+        yml_by_date (dict[datetime.date, list[dict]]):
+            The YAML activities to book on each date.
+
+    Returns:
+        dict[datetime.date, dict]:
+            The possibly matching activities of each date.
+    """
+    lists = {date: {"activities": []} for date in yml_by_date}
+    by_iso = {
+        date.isoformat(): (yml_by_date[date], lists[date]["activities"])
+        for date in yml_by_date
+    }
+    with s.get(url, params=params, headers=headers, stream=True) as r:
+        for f_act in _iter_remote_activities(r.iter_content(STREAM_CHUNK)):
+            yml_acts, date_list = by_iso.get(
+                f_act["Activity"]["start"][:10], (None, None)
+            )
+            if yml_acts and _can_match(yml_acts, f_act):
+                date_list.append(f_act)
+    return lists
+
+
+def _can_match(yml_acts: list[dict], f_act: dict) -> bool:
+    """
+    Check if a remote activity matches any of the YAML activities.
+    """
+    start = f_act["Activity"]["start"]
+    name = f_act["ActivityType"]["name"]
+    for yml_act in yml_acts:
+        if _is_start_key(yml_act["time"]):
+            matches_time = start[11:16] == yml_act["time"]
         else:
-            logger.warning("No matching activity was found.")
+            matches_time = yml_act["time"] in start
+        if matches_time and yml_act["name"] in name:
+            return True
+    return False
+
+
+def _iter_remote_activities(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Parse the activity list incrementally, yielding every record of its
+    "activities" array as soon as it has been received in full.
+
+    Args:
+        chunks (Iterable[bytes]): The response body in chunks.
+
+    Yields:
+        dict: The remote activities, in the order of the list.
+
+    Raises:
+        ValueError: If the body is not an activity list.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = None
+    while True:
+        if pos is None:
+            start = _ACTIVITIES_ARRAY.search(buffer)
+            if start is not None:
+                pos = start.end()
+        while pos is not None:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                f_act, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The record is not complete yet
+                break
+            yield f_act
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("The activity list ended before it was complete")
+        if pos is not None:
+            buffer, pos = buffer[pos:], 0
+        buffer += text.decode(chunk)
+
+
+def _fetch_activities(
+    s: requests.session,
+    url: str,
+    params: dict,
+    headers: dict,
+    cache: Activity_Cache | None,
+    dates: list[datetime.date],
+) -> dict[datetime.date, dict]:
+    """
+    Fetch the activity list for a range of dates from feelgood in one
+    request, split it per date and store every date in the cache.
+
+    Args:
+        s (requests.session): The logged in session.
+        url (str): The activity list url.
+        params (dict): The query parameters, facility and date range.
+        headers (dict): Headers to send with the request.
+        cache (Activity_Cache | None): The cache to store the lists in,
+            None to not store them.
+        dates (list[datetime.date]): The dates to keep.
+
+    Returns:
+        dict[datetime.date, dict]: The activity list of each date.
+    """
+    r = s.get(url, params=params, headers=headers)
+    lists = _split_by_date(r.json(), dates)
+    if cache is not None:
+        for date, feelgood_activities in lists.items():
+            cache.put(params["facility"], date, feelgood_activities)
+    return lists
 
-        time.sleep(random.randint(4, 13))
+
+def _split_by_date(
+    feelgood_activities: dict,
+    dates: list[datetime.date],
+) -> dict[datetime.date, dict]:
+    """
+    Split an activity list spanning several dates into one list per date.
+
+    Args:
+        feelgood_activities (dict):
+            The activity list as returned by feelgood.
+        dates (list[datetime.date]): The dates to keep.
+
+    Returns:
+        dict[datetime.date, dict]: The activity list of each date.
+    """
+    lists = {date: {"activities": []} for date in dates}
+    by_iso = {date.isoformat(): lists[date] for date in dates}
+    for f_act in feelgood_activities["activities"]:
+        date_list = by_iso.get(f_act["Activity"]["start"][:10])
+        if date_list is not None:
+            date_list["activities"].append(f_act)
+    return lists
+
+
+def _match_by_date(
+    urls: dict,
+    yml_by_date: dict[datetime.date, list[dict]],
+    lists: dict[datetime.date, dict],
+) -> list[Feelgood_Activity]:
+    """
+    Match the YAML activities of each date against the list of that date.
+
+    Args:
+        urls (dict): Dictionary containing base and participation URLs.
+        yml_by_date (dict[datetime.date, list[dict]]):
+            The YAML activities to book on each date.
+        lists (dict[datetime.date, dict]): The activity list of each date.
+
+    Returns:
+        list[Feelgood_Activity]: List of Feelgood_Activity objects to book.
+    """
+    act_to_book = []
+    for date, yml_acts in yml_by_date.items():
+        act_to_book += _match_yml_activity_to_remote(
+            urls, yml_acts, lists[date]
+        )
+    return act_to_book
+
+
+def _refreshed_matches(
+    refresh: Future,
+    urls: dict,
+    yml_by_date: dict[datetime.date, list[dict]],
+    activities_to_book: list[Feelgood_Activity],
+) -> list[Feelgood_Activity]:
+    """
+    Wait for a background refresh of the activity lists and match against
+    them. If the refresh failed the matches from the cached lists are kept.
+
+    Args:
+        refresh (Future): The pending _fetch_activities call.
+        urls (dict): Dictionary containing base and participation URLs.
+        yml_by_date (dict[datetime.date, list[dict]]):
+            The YAML activities to book on each date.
+        activities_to_book (list[Feelgood_Activity]):
+            The matches from the cached lists.
+
+    Returns:
+        list[Feelgood_Activity]: List of Feelgood_Activity objects to book.
+    """
+    try:
+        lists = refresh.result()
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Could not refresh the activity list: {e=}")
+        return activities_to_book
+    return _match_by_date(urls, yml_by_date, lists)
+
+
+def _logout(
+    s: requests.session,
+    urls: dict,
+    username: str,
+) -> bool:
+    """
+    Log out from feelgood with the session.
+
+    Returns:
+        bool: True if logging out succeeded.
+    """
+    try:
         r = s.post(f"{urls['base_url']}{urls['logout']}")
-        if r.status_code == 200:
-            logger.success(f"Logged out: {username}")
-        else:
-            logger.error("Logout fail, exiting...")
+    except requests.RequestException as e:
+        logger.error(f"Logout fail: {e=}")
+        return False
+    if r.status_code == 200:
+        logger.success(f"Logged out: {username}")
+        return True
+    logger.error("Logout fail, exiting...")
+    return False
+
+
+def _delayed_logout(
+    s: requests.session,
+    urls: dict,
+    username: str,
+    delay: float,
+) -> bool:
+    """
+    Log out and close the session after delay seconds. The process lives
+    for the delay, the multi-account runner overlaps the delays of its
+    accounts instead.
+
+    Args:
+        s (requests.session): The logged in session, closed afterwards.
+        urls (dict): Dictionary containing base and logout URLs.
+        username (str): The logged in username, for logging.
+        delay (float): Seconds to wait before logging out.
+
+    Returns:
+        bool: True if logging out succeeded.
+    """
+    try:
+        time.sleep(delay)
+        return _logout(s, urls, username)
+    finally:
+        s.close()
 
 
 def _post_bookings(
     test: bool,
     headers: dict,
-    future_date: datetime.date,
     s: requests.session,
     activities_to_book: list[Feelgood_Activity],
+    release_time: str = "08:00:01",
+    lead: float = 0.0,
+    warm_url: str = None,
+    warmup: float = 2.0,
+    retry_interval: tuple[float, float] = (0.02, 0.05),
+    retry_window: float = 2.0,
+    timings: Timings = None,
+    fallback: str = "speculative",
 ) -> list[tuple[requests.Response, Feelgood_Activity]]:
+    """
+    Wait for the release time once and then fire every booking concurrently,
+    so that all participate requests leave within the same few milliseconds.
+
+    Args:
+        test (bool): Only log the bookings, do not send anything.
+        headers (dict): Headers to send with each booking request.
+        s (requests.session): The logged in session.
+        activities_to_book (list[Feelgood_Activity]): Activities to book.
+        release_time (str, optional): The server time, "HH:MM:SS", when
+            booking opens, None to book right away. Defaults to "08:00:01".
+        lead (float, optional): Seconds to fire ahead of release_time,
+            see _calibrate_clock. Defaults to 0.0.
+        warm_url (str, optional): If given, one connection per booking is
+            opened against this url shortly before the release, see
+            _warm_connections. Defaults to None.
+        warmup (float, optional): Seconds before the release to warm the
+            connections. Defaults to 2.0.
+        retry_interval (tuple[float, float], optional): Bounds in seconds
+            of the random pause before resending a booking that was too
+            early. Defaults to (0.02, 0.05).
+        retry_window (float, optional): Seconds after the first attempt
+            during which too early bookings are resent. Defaults to 2.0.
+        timings (Timings, optional): Collects the wait and the send and
+            receive times of every request. Defaults to None.
+        fallback (str, optional): How alternatives of an activity are
+            booked, see _booking_chains. Defaults to "speculative".
+
+    Returns:
+        list[tuple[requests.Response, Feelgood_Activity]]:
+            The responses paired with their activity, in completion order.
+    """
+    timings = timings or Timings()
     bookings = []
-    params = {"force": 1}
-    for activity_to_book in activities_to_book:
-        # Create generate payload function in feelgood class
-        payload = {
-            "ActivityBooking": {"participants": 1, "resources": {}},
-            "send_confirmation": 1,
-        }
-        if "Boka" in activity_to_book.name:
-            #  Move this to the Feelgood class
-            epoch = _get_simple_epoch(future_date, activity_to_book.start_time)
-            payload["ActivityBooking"]["book_start"] = str(epoch)
-            payload["ActivityBooking"]["book_length"] = "30"
-
-        if test:
+    if test:
+        for activity_to_book in activities_to_book:
             logger.debug(activity_to_book.summary())
-            logger.debug(f"Payload: {payload}")
-        else:
-            hour_goal = 8
-            minute_goal = 0
-            second_goal = 1
-            _wait_for_time(hour_goal, minute_goal, second_goal)
-
-            r = s.post(
-                activity_to_book.url,
-                headers=headers,
-                params=params,
-                json=payload,
+            logger.debug(f"Payload: {_booking_payload(activity_to_book)}")
+        return bookings
+
+    prepared = _prepare_bookings(s, headers, activities_to_book)
+    if not prepared:
+        return bookings
+    chains = _booking_chains(prepared, fallback)
+    send_kwargs = s.merge_environment_settings(
+        prepared[0][0].url, {}, None, None, None
+    )
+
+    # Start the workers before waiting so no thread is spawned on the hot
+    # path, they are all released by the same event.
+    release = threading.Event()
+
+    def _post(request, summary):
+        sent = timings.now()
+        r, attempts = _send_booking(
+            s, request, send_kwargs, retry_interval, retry_window
+        )
+        timings.record_request(
+            summary,
+            sent,
+            timings.now(),
+            attempts,
+            r.status_code,
+        )
+        return r, attempts
+
+    def _post_chain(chain):
+        release.wait()
+        results = []
+        for request, activity_to_book, summary in chain:
+            try:
+                r, attempts = _post(request, summary)
+            except requests.RequestException as e:
+                results.append((activity_to_book, None, None, e))
+                break
+            results.append((activity_to_book, r, attempts, None))
+            # Go on to the next alternative only if this one is taken
+            if not _is_full(r):
+                break
+        return results
+
+    # Log calls from the last wake-up until every answer is in are only
+    # formatted and written once the release window is over.
+    hot_log = Log_Buffer()
+    with hot_log, ThreadPoolExecutor(max_workers=len(chains)) as executor:
+        futures = [
+            executor.submit(
+                _post_chain,
+                [
+                    (request, activity_to_book, activity_to_book.summary())
+                    for request, activity_to_book in chain
+                ],
+            )
+            for chain in chains
+        ]
+
+        if release_time:
+            _wait_for_release(
+                s,
+                release_time,
+                lead,
+                warm_url,
+                warmup,
+                len(chains),
+                timings,
+                hot_log,
             )
-            bookings.append((r, activity_to_book))
+        release.set()
+
+        for future in as_completed(futures):
+            bookings += _chain_bookings(future.result(), hot_log)
 
     return bookings
 
 
+def _send_booking(
+    s: requests.session,
+    request: requests.PreparedRequest,
+    send_kwargs: dict,
+    retry_interval: tuple[float, float] = (0.02, 0.05),
+    retry_window: float = 2.0,
+) -> tuple[requests.Response, int]:
+    """
+    Send a prepared booking, and resend it while feelgood answers that it
+    was too early, until retry_window seconds after the first attempt.
+
+    Args:
+        s (requests.session): The logged in session.
+        request (requests.PreparedRequest): The prepared booking.
+        send_kwargs (dict): Keyword arguments for s.send.
+        retry_interval (tuple[float, float], optional): Bounds in seconds
+            of the random pause before resending. Defaults to (0.02, 0.05).
+        retry_window (float, optional): Seconds after the first attempt
+            during which too early bookings are resent. Defaults to 2.0.
+
+    Returns:
+        tuple[requests.Response, int]: The last response and the number
+            of attempts.
+    """
+    deadline = time.perf_counter() + retry_window
+    attempts = 1
+    r = s.send(request, **send_kwargs)
+    # Only a too early answer is worth another try, a few ms of clock
+    # skew should not cost the slot.
+    while _is_too_early(r) and time.perf_counter() < deadline:
+        time.sleep(random.uniform(*retry_interval))
+        attempts += 1
+        r = s.send(request, **send_kwargs)
+    return r, attempts
+
+
+def _wait_for_release(
+    s: requests.session,
+    release_time: str,
+    lead: float,
+    warm_url: str,
+    warmup: float,
+    connections: int,
+    timings: Timings,
+    log=logger,
+) -> None:
+    """
+    Wait until lead seconds before the release time, warming connections
+    warmup seconds before that if warm_url is given.
+
+    Args:
+        s (requests.session): The logged in session.
+        release_time (str): The server time, "HH:MM:SS", when booking
+            opens.
+        lead (float): Seconds to return ahead of release_time.
+        warm_url (str): The url to warm connections against, None to not
+            warm any.
+        warmup (float): Seconds before the release to warm them.
+        connections (int): The number of connections to warm.
+        timings (Timings): Collects the target and the jitter of the wait.
+        log (optional): Where to log to once the time is reached, like a
+            Log_Buffer. Defaults to the logger.
+    """
+    goal = datetime.time.fromisoformat(release_time)
+    target = datetime.datetime.combine(datetime.date.today(), goal)
+    timings.set("target", target.timestamp() - lead)
+    with timings.phase("wait"):
+        if warm_url:
+            _wait_for_time(goal.hour, goal.minute, goal.second, lead + warmup)
+            _warm_connections(s, warm_url, connections)
+        jitter = _wait_for_time(goal.hour, goal.minute, goal.second, lead, log)
+    timings.set("jitter", jitter)
+
+
+def _chain_bookings(
+    results: list[tuple],
+    log=logger,
+) -> list[tuple[requests.Response, Feelgood_Activity]]:
+    """
+    Log the results of one chain of bookings and keep the answered ones.
+
+    Args:
+        results (list[tuple]): (activity, response, attempts, error) of
+            every booking sent in the chain, response is None on an error.
+        log (optional): Where to log to, like a Log_Buffer. Defaults to
+            the logger.
+
+    Returns:
+        list[tuple[requests.Response, Feelgood_Activity]]:
+            The responses paired with their activity.
+    """
+    bookings = []
+    for activity_to_book, r, attempts, error in results:
+        if error is not None:
+            log.error("Booking request failed: {}", activity_to_book)
+            log.error("e={!r}", error)
+            continue
+        log.info("Attempts: {}, {}", attempts, activity_to_book.summary)
+        bookings.append((r, activity_to_book))
+    return bookings
+
+
+def _booking_chains(
+    prepared: list[tuple[requests.PreparedRequest, Feelgood_Activity]],
+    fallback: str = "speculative",
+) -> list[list[tuple[requests.PreparedRequest, Feelgood_Activity]]]:
+    """
+    Split the bookings into the chains the workers send, one after the
+    other within a chain and the chains all at once.
+
+    With "speculative" every booking is its own chain, so the alternatives
+    of an activity are sent together with it and the surplus is cancelled
+    afterwards, see _cancel_surplus. Alternatives that book the same
+    remote activity, like Boka slots, can not be cancelled apart, so they
+    still form one chain. With "on_full" the alternatives of an activity
+    form one chain in order of rank, the next one is only sent when the
+    previous one was full.
+
+    Args:
+        prepared (list[tuple[requests.PreparedRequest, Feelgood_Activity]]):
+            The prepared bookings.
+        fallback (str, optional): "speculative" or "on_full".
+            Defaults to "speculative".
+
+    Returns:
+        list[list[tuple[requests.PreparedRequest, Feelgood_Activity]]]:
+            The chains of bookings.
+
+    Raises:
+        ValueError: If fallback is not known.
+    """
+    if fallback not in ("speculative", "on_full"):
+        raise ValueError(f"Unknown fallback: {fallback}")
+
+    chains = {}
+    for booking in prepared:
+        activity_to_book = booking[1]
+        if activity_to_book.group is None:
+            key = id(booking)
+        elif fallback == "speculative":
+            key = (
+                activity_to_book.date,
+                activity_to_book.group,
+                activity_to_book.id,
+            )
+        else:
+            key = (activity_to_book.date, activity_to_book.group)
+        chains.setdefault(key, []).append(booking)
+    return [
+        sorted(chain, key=lambda booking: booking[1].rank)
+        for chain in chains.values()
+    ]
+
+
+def _cancel(
+    s: requests.session,
+    urls: dict,
+    headers: dict,
+    activity_id: str,
+) -> requests.Response:
+    """
+    Cancel the booking of an activity.
+
+    Args:
+        s (requests.session): The logged in session.
+        urls (dict): Dictionary containing base and cancel URLs.
+        headers (dict): Headers to send with the request.
+        activity_id (str): The feelgood id of the activity.
+
+    Returns:
+        requests.Response: The response from feelgood.
+    """
+    return s.post(
+        f"{urls['base_url']}{urls['cancel']}{activity_id}/1",
+        headers=headers,
+        params={"force": 1},
+    )
+
+
+def _cancel_surplus(
+    s: requests.session,
+    urls: dict,
+    headers: dict,
+    bookings: list[tuple[requests.Response, Feelgood_Activity]],
+) -> list[Feelgood_Activity]:
+    """
+    Keep only the best ranked booking among the alternatives of each
+    activity and cancel the others. An alternative that feelgood answered
+    is booked already, like from an earlier run, is a booking as well.
+    Cancelling goes by remote activity, so an alternative that books the
+    same one as the kept booking is never cancelled.
+
+    Args:
+        s (requests.session): The logged in session.
+        urls (dict): Dictionary containing base and cancel URLs.
+        headers (dict): Headers to send with the requests.
+        bookings (list[tuple[requests.Response, Feelgood_Activity]]):
+            The responses paired with their activity.
+
+    Returns:
+        list[Feelgood_Activity]: The activities whose booking was cancelled.
+    """
+    cancelled = []
+    for surplus in _surplus_bookings(bookings):
+        try:
+            r = _cancel(s, urls, headers, surplus.id)
+        except requests.RequestException as e:
+            logger.error(f"Could not cancel surplus booking: {surplus}")
+            logger.error(f"{e=}")
+            continue
+        if _is_cancelled(r, surplus):
+            cancelled.append(surplus)
+    return cancelled
+
+
+def _surplus_bookings(
+    bookings: list[tuple[requests.Response, Feelgood_Activity]],
+) -> list[Feelgood_Activity]:
+    """
+    Find the bookings to cancel, see _cancel_surplus. Every remote
+    activity is in it once at most, and never the one of a kept booking.
+
+    Args:
+        bookings (list[tuple[requests.Response, Feelgood_Activity]]):
+            The responses paired with their activity.
+
+    Returns:
+        list[Feelgood_Activity]: The activities to cancel.
+    """
+    booked = {}
+    for r, activity_to_book in bookings:
+        if activity_to_book.group is not None and _holds_booking(r):
+            key = (activity_to_book.date, activity_to_book.group)
+            booked.setdefault(key, []).append(activity_to_book)
+
+    surplus = []
+    for group in booked.values():
+        group.sort(key=lambda activity_to_book: activity_to_book.rank)
+        handled = {group[0].id}
+        for activity_to_book in group[1:]:
+            if activity_to_book.id not in handled:
+                handled.add(activity_to_book.id)
+                surplus.append(activity_to_book)
+    return surplus
+
+
+def _is_cancelled(r: requests.Response, surplus: Feelgood_Activity) -> bool:
+    """
+    Check and log if the cancellation of a surplus booking succeeded.
+    """
+    if r.status_code == 200:
+        logger.success(f"Cancelled surplus booking: {surplus}")
+        return True
+    logger.error(f"Could not cancel surplus booking: {surplus}")
+    logger.error(f"{r.status_code=}")
+    return False
+
+
+def _full_activities(
+    bookings: list[tuple[requests.Response, Feelgood_Activity]],
+) -> list[Feelgood_Activity]:
+    """
+    Find the activities that were fully booked, leaving out those with an
+    alternative that was booked instead.
+
+    Args:
+        bookings (list[tuple[requests.Response, Feelgood_Activity]]):
+            The responses paired with their activity.
+
+    Returns:
+        list[Feelgood_Activity]: The fully booked activities.
+    """
+    booked_groups = {
+        (activity_to_book.date, activity_to_book.group)
+        for r, activity_to_book in bookings
+        if activity_to_book.group is not None and _holds_booking(r)
+    }
+    return [
+        activity_to_book
+        for r, activity_to_book in bookings
+        if _is_full(r)
+        and (activity_to_book.date, activity_to_book.group)
+        not in booked_groups
+    ]
+
+
+def _booking_payload(activity_to_book: Feelgood_Activity) -> dict:
+    """
+    Create the participate payload for an activity, Boka activities also
+    need the start and length of the booked time.
+
+    Args:
+        activity_to_book (Feelgood_Activity): The activity to book.
+
+    Returns:
+        dict: The payload to send as JSON.
+    """
+    payload = {
+        "ActivityBooking": {"participants": 1, "resources": {}},
+        "send_confirmation": 1,
+    }
+    if "Boka" in activity_to_book.name:
+        epoch = _get_simple_epoch(
+            activity_to_book.date, activity_to_book.start_time
+        )
+        payload["ActivityBooking"]["book_start"] = str(epoch)
+        payload["ActivityBooking"]["book_length"] = "30"
+    return payload
+
+
+def _prepare_bookings(
+    s: requests.session,
+    headers: dict,
+    activities_to_book: list[Feelgood_Activity],
+) -> list[tuple[requests.PreparedRequest, Feelgood_Activity]]:
+    """
+    Build and encode every booking request ahead of the release, with
+    url, headers, cookies and JSON body ready, so sending it is all that
+    is left on the hot path.
+
+    Args:
+        s (requests.session): The logged in session.
+        headers (dict): Headers to send with each booking request.
+        activities_to_book (list[Feelgood_Activity]): Activities to book.
+
+    Returns:
+        list[tuple[requests.PreparedRequest, Feelgood_Activity]]:
+            The prepared requests paired with their activity.
+    """
+    return [
+        (
+            s.prepare_request(
+                requests.Request(
+                    "POST",
+                    activity_to_book.url,
+                    headers=headers,
+                    params={"force": 1},
+                    json=_booking_payload(activity_to_book),
+                )
+            ),
+            activity_to_book,
+        )
+        for activity_to_book in activities_to_book
+    ]
+
+
+def _is_booked(r: requests.Response) -> bool:
+    """
+    Check if feelgood answered that the booking was made.
+    """
+    try:
+        json = r.json()
+    except ValueError:
+        return False
+    return (
+        r.status_code == 200
+        and isinstance(json, dict)
+        and json.get("result") == "ok"
+    )
+
+
+def _is_already_booked(r: requests.Response) -> bool:
+    """
+    Check if feelgood answered that the user is booked already.
+    """
+    try:
+        json = r.json()
+    except ValueError:
+        return False
+    return (
+        isinstance(json, dict)
+        and json.get("error_code") == "USER_ALREADY_BOOKED"
+    )
+
+
+def _holds_booking(r: requests.Response) -> bool:
+    """
+    Check if the user is booked after the answer, by this booking or an
+    earlier one.
+    """
+    return _is_booked(r) or _is_already_booked(r)
+
+
+def _is_full(r: requests.Response) -> bool:
+    """
+    Check if feelgood answered that the activity is fully booked.
+    """
+    try:
+        json = r.json()
+    except ValueError:
+        return False
+    return isinstance(json, dict) and (
+        json.get("error_code") == "ACTIVITY_FULL"
+        or json.get("message") == "Denna tid är inte tillgänglig längre."
+    )
+
+
+def _is_too_early(r: requests.Response) -> bool:
+    """
+    Check if feelgood answered that the booking is not open yet.
+    """
+    try:
+        json = r.json()
+    except ValueError:
+        return False
+    return (
+        isinstance(json, dict)
+        and json.get("error_code") == "ACTIVITY_BOOKING_TO_EARLY"
+    )
+
+
 def _return_matching_activities(
     activities,
     future_date,
 ):
     yml_acts = []
     for yml_act in activities["activities"]:
-        if future_date.isoweekday() == parse_day(yml_act["day"]):
+        weekday = yml_act.get("weekday") or parse_day(yml_act["day"])
+        if future_date.isoweekday() == weekday:
             logger.debug(
-                f"Activity local match: name: "
-                f"{yml_act['name']}, day: {yml_act['day']}"
+                "Activity local match: name: {}, day: {}",
+                yml_act["name"],
+                yml_act["day"],
             )
             yml_acts.append(yml_act)
 
@@ -253,7 +1478,7 @@ def _parse_booking(
     """
     r, activity_to_book = booking
     json = r.json()
-    if r.status_code == 200 and json["result"] == "ok":
+    if r.status_code == 200 and json.get("result") == "ok":
         logger.success(f"Successfully booked: {activity_to_book.summary()}")
 
     elif "error_code" in json:
@@ -324,39 +1549,77 @@ def _match_yml_activity_to_remote(
         list[Feelgood_Activity]:
             List of Feelgood_Activity objects to be booked.
     """
-    act_to_book = []
-    for f_act in feelgood_activities["activities"]:
-        for yml_act in yml_acts:
-            if (
-                yml_act["name"] in f_act["ActivityType"]["name"]
-                and yml_act["time"] in f_act["Activity"]["start"]
-            ):
-                booking_url = (
-                    f"{urls['base_url']}"
-                    f"{urls['participate']}"
-                    f"{f_act['Activity']['id']}"
-                )
+    index = _index_remote_activities(feelgood_activities)
+    matches = []
+    for j, yml_act in enumerate(yml_acts):
+        if _is_start_key(yml_act["time"]):
+            candidates = index.get(yml_act["time"], [])
+        else:
+            candidates = [
+                (i, f_act)
+                for i, f_act in enumerate(feelgood_activities["activities"])
+                if yml_act["time"] in f_act["Activity"]["start"]
+            ]
+        for i, f_act in candidates:
+            if yml_act["name"] in f_act["ActivityType"]["name"]:
+                matches.append((i, j, f_act, yml_act))
 
-                fa = Feelgood_Activity(
-                    url=booking_url,
-                    name=f_act["ActivityType"]["name"],
-                    start=f_act["Activity"]["start"],
-                )
+    # Keep the order of the remote list, as the bookings are made in it
+    matches.sort(key=lambda match: match[:2])
 
-                if "start_time" in yml_act:
-                    fa.start_time = yml_act["start_time"]
+    act_to_book = []
+    for _, _, f_act, yml_act in matches:
+        fa = Feelgood_Activity.from_remote(
+            f_act,
+            urls,
+            yml_act.get("start_time", "0"),
+            yml_act.get("group"),
+            yml_act.get("rank", 0),
+        )
 
-                logger.debug(f"Activity remote match: {fa.summary()}")
-                act_to_book.append(fa)
+        logger.opt(lazy=True).debug("Activity remote match: {}", fa.summary)
+        act_to_book.append(fa)
 
     return act_to_book
 
 
+def _index_remote_activities(
+    feelgood_activities: dict,
+) -> dict[str, list[tuple[int, dict]]]:
+    """
+    Index the remote activities on the "HH:MM" part of their start, so
+    every YAML activity only has to be compared to the handful of remote
+    activities starting at the same time.
+
+    Args:
+        feelgood_activities (dict):
+            The activity list as returned by feelgood.
+
+    Returns:
+        dict[str, list[tuple[int, dict]]]:
+            Remote activities and their position in the list by start time.
+    """
+    index = {}
+    for i, f_act in enumerate(feelgood_activities["activities"]):
+        key = f_act["Activity"]["start"][11:16]
+        index.setdefault(key, []).append((i, f_act))
+    return index
+
+
+def _is_start_key(time: str) -> bool:
+    """
+    Check if a YAML activity time is a plain "HH:MM" usable as index key.
+    """
+    return len(time) == 5 and time[2] == ":"
+
+
 def _wait_for_time(
     hour_goal: int,
     minute_goal: int,
     second_goal: int,
-) -> None:
+    lead: float = 0.0,
+    log=logger,
+) -> float:
     """
     Wait until reaching a specific time today. If
     the time difference is negative,
@@ -366,6 +1629,14 @@ def _wait_for_time(
         hour_goal (int): The target hour to wait for.
         minute_goal (int): The target minute within the hour to wait for.
         second_goal (int): The target second within the minute to wait for.
+        lead (float, optional): Seconds to return ahead of the target time,
+            may be negative. Defaults to 0.0.
+        log (optional): Where to log to once the time is reached, like a
+            Log_Buffer. Defaults to the logger.
+
+    Returns:
+        float: The fire-time jitter in seconds, how late the function
+            returned compared to the target time.
     """
     time_goal = datetime.datetime(
         year=datetime.date.today().year,
@@ -376,10 +1647,165 @@ def _wait_for_time(
         second=second_goal,
         microsecond=0,
     )
+    time_goal -= datetime.timedelta(seconds=lead)
     diff = time_goal - datetime.datetime.now()
     if diff.total_seconds() > 0.0:
         logger.info(f"Sleeping for: {diff}")
-        time.sleep(diff.total_seconds())
-        logger.success("Done sleeping")
+        jitter = _sleep_until(time.perf_counter() + diff.total_seconds())
+        log.success("Done sleeping, jitter: {:.3f} ms", jitter * 1000)
+        return jitter
+    else:
+        log.warning("Time difference negative. Booking immediately!")
+        return -diff.total_seconds()
+
+
+def _mount_pool(
+    s: requests.session,
+    base_url: str,
+    size: int,
+) -> None:
+    """
+    Mount an adapter on the session whose connection pool for base_url can
+    hold one connection per booking, so no booking has to wait for a
+    connection or open a new one when they are all sent at once.
+
+    Args:
+        s (requests.session): The session to configure.
+        base_url (str): The url prefix the adapter is used for.
+        size (int): Number of connections to keep in the pool.
+    """
+    adapter = requests.adapters.HTTPAdapter(
+        pool_maxsize=max(size, requests.adapters.DEFAULT_POOLSIZE)
+    )
+    s.mount(base_url, adapter)
+
+
+def _warm_connections(
+    s: requests.session,
+    url: str,
+    count: int,
+) -> None:
+    """
+    Open count connections to the server by sending count overlapping HEAD
+    requests, leaving the pool with hot keep-alive sockets, TCP and TLS
+    handshakes done, for the bookings that follow.
+
+    Args:
+        s (requests.session): The session whose pool to warm.
+        url (str): A cheap url to send HEAD requests to.
+        count (int): Number of connections to open.
+    """
+    barrier = threading.Barrier(count)
+
+    def _head():
+        barrier.wait()
+        return s.head(url)
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(_head) for _ in range(count)]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except requests.RequestException as e:
+                logger.warning(f"Connection warm-up failed: {e=}")
+    logger.debug(f"Warmed {count} connection(s) to {url}")
+
+
+def _calibrate_clock(
+    s: requests.session,
+    url: str,
+    samples: int = 10,
+) -> tuple[float, float]:
+    """
+    Estimate how far the server clock is ahead of ours and the one-way
+    latency to the server, from the Date header of a few HEAD requests.
+
+    The Date header only has whole seconds, so each sample bounds the
+    offset to an interval. The samples are spread evenly over one second
+    and the intersection of their intervals narrows the estimate down to
+    roughly 1/samples of a second plus the round-trip time.
+
+    Args:
+        s (requests.session): The logged in session.
+        url (str): A cheap url to send HEAD requests to.
+        samples (int, optional): Number of requests. Defaults to 10.
+
+    Returns:
+        tuple[float, float]: The clock offset (server minus local) and
+            the one-way latency, both in seconds. Zeros if the server did
+            not send a usable Date header.
+    """
+    lower, upper = -math.inf, math.inf
+    midpoints = []
+    rtts = []
+    start = time.perf_counter()
+    for i in range(samples):
+        _sleep_until(start + i / samples)
+        t0 = time.time()
+        try:
+            r = s.head(url)
+        except requests.RequestException as e:
+            logger.warning(f"Clock sample failed: {e=}")
+            continue
+        t1 = time.time()
+        date = r.headers.get("Date")
+        if not date:
+            continue
+        try:
+            server = email.utils.parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            continue
+        lower = max(lower, server - t1)
+        upper = min(upper, server + 1 - t0)
+        midpoints.append(server + 0.5 - (t0 + t1) / 2)
+        rtts.append(t1 - t0)
+
+    if not rtts:
+        logger.warning("Could not calibrate against the server clock")
+        return 0.0, 0.0
+
+    if lower <= upper:
+        offset = (lower + upper) / 2
     else:
-        logger.warning("Time difference negative. Booking immediately!")
+        offset = statistics.median(midpoints)
+    latency = min(rtts) / 2
+    logger.info(
+        f"Server clock offset: {offset * 1000:.1f} ms, "
+        f"latency: {latency * 1000:.1f} ms"
+    )
+    return offset, latency
+
+
+SPIN_SECONDS = 0.02
+
+
+def _sleep_until(
+    deadline: float,
+    spin_seconds: float = SPIN_SECONDS,
+) -> float:
+    """
+    Sleep until a deadline on the monotonic performance counter.
+
+    A plain sleep oversleeps by several milliseconds on a loaded machine,
+    so the bulk of the wait is slept coarsely and the last spin_seconds
+    are spent spinning on the counter.
+
+    Args:
+        deadline (float): Target value of time.perf_counter().
+        spin_seconds (float, optional): How long before the deadline to
+            stop sleeping and start spinning. Defaults to SPIN_SECONDS.
+
+    Returns:
+        float: The jitter in seconds, time.perf_counter() minus deadline
+            at the moment of returning.
+    """
+    remaining = deadline - time.perf_counter()
+    while remaining > spin_seconds:
+        time.sleep(remaining - spin_seconds)
+        remaining = deadline - time.perf_counter()
+
+    now = time.perf_counter()
+    while now < deadline:
+        now = time.perf_counter()
+
+    return now - deadline
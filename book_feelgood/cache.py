@@ -0,0 +1,115 @@
+import datetime
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+
+class Activity_Cache:
+    """
+    On-disk cache of fetched activity lists, one JSON file per facility and
+    date. Entries younger than ttl seconds are fresh, older ones can still
+    be used while a newer list is fetched.
+    """
+
+    def __init__(self, directory: str = "cache", ttl: int = 3600) -> None:
+        self._directory = Path(directory)
+        self._ttl = ttl
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    def _path(self, facility: str, date: datetime.date) -> Path:
+        return self.directory / f"{date.isoformat()}_{facility}.json"
+
+    def get(
+        self,
+        facility: str,
+        date: datetime.date,
+    ) -> tuple[dict | None, bool]:
+        """
+        Look up the activity list for a facility and date.
+
+        Args:
+            facility (str): The facility uuid.
+            date (datetime.date): The date of the list.
+
+        Returns:
+            tuple[dict | None, bool]: The cached list, None on a miss, and
+                whether it is younger than the ttl.
+        """
+        path = self._path(facility, date)
+        try:
+            age = time.time() - path.stat().st_mtime
+            with open(path, "r", encoding="utf-8") as file:
+                activities = json.load(file)
+        except (OSError, ValueError):
+            return None, False
+
+        fresh = age < self.ttl
+        logger.debug(f"Cache hit: {path}, age: {age:.0f} s, {fresh=}")
+        return activities, fresh
+
+    def put(
+        self,
+        facility: str,
+        date: datetime.date,
+        activities: dict,
+    ) -> None:
+        """
+        Store the activity list for a facility and date. A failed write
+        is only logged, the list has been fetched already.
+
+        Args:
+            facility (str): The facility uuid.
+            date (datetime.date): The date of the list.
+            activities (dict): The activity list as returned by feelgood.
+        """
+        path = self._path(facility, date)
+        tmp_path = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see half a
+            # file, with a name of its own for every writer, as accounts
+            # running in threads may store the same list at once
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=self.directory,
+                prefix=f"{path.stem}.",
+                suffix=".tmp",
+                delete=False,
+            ) as file:
+                tmp_path = file.name
+                json.dump(activities, file)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache {path}: {e=}")
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+
+    def evict(self, today: datetime.date) -> None:
+        """
+        Remove the lists of dates before today.
+
+        Args:
+            today (datetime.date): The first date to keep.
+        """
+        if not self.directory.is_dir():
+            return
+        for path in self.directory.glob("*.json"):
+            try:
+                date = datetime.date.fromisoformat(path.name[:10])
+            except ValueError:
+                continue
+            if date < today:
+                logger.debug(f"Evicting: {path}")
+                path.unlink(missing_ok=True)
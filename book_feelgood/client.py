@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+from typing import TYPE_CHECKING
+
+from book_feelgood.book import (
+    Feelgood_Activity,
+    _cancel,
+    _fetch_activities,
+    _list_params,
+    _logout,
+    _prepare_bookings,
+    _resume_or_login,
+    _send_booking,
+    _stream_activities,
+)
+from book_feelgood.parse import lazy_import
+
+requests = lazy_import("requests")
+
+if TYPE_CHECKING:
+    from book_feelgood.cache import Activity_Cache
+    from book_feelgood.sessions import Session_Store
+
+
+class Feelgood_Client:
+    """
+    Asynchronous client for the feelgood API.
+
+    Every call runs the blocking request in a worker thread with
+    asyncio.to_thread, so many calls, for one or several accounts, can be
+    awaited concurrently on a single event loop while requests stays the
+    only HTTP dependency. The calls are built on the same helpers as the
+    synchronous pipeline in book.
+    """
+
+    def __init__(
+        self,
+        urls: dict,
+        headers: dict,
+        session: requests.Session = None,
+    ) -> None:
+        self._urls = urls
+        self._headers = headers
+        self._session = session or requests.session()
+        self._send_kwargs = None
+
+    @property
+    def urls(self):
+        return self._urls
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def session(self):
+        return self._session
+
+    async def __aenter__(self) -> "Feelgood_Client":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def login(
+        self,
+        username: str,
+        password: str,
+        store: Session_Store = None,
+    ) -> bool:
+        """
+        Log in with the client's session, or resume the session stored for
+        the username if it is still logged in.
+
+        Returns:
+            bool: True if the session is logged in.
+        """
+        return await asyncio.to_thread(
+            _resume_or_login,
+            self.session,
+            self.urls,
+            username,
+            password,
+            store,
+        )
+
+    async def list_activities(
+        self,
+        facility: str,
+        dates: list[datetime.date],
+        cache: Activity_Cache = None,
+    ) -> dict[datetime.date, dict]:
+        """
+        List a facility's activities of several dates with one request.
+
+        Args:
+            facility (str): The facility uuid.
+            dates (list[datetime.date]): The dates to list.
+            cache (Activity_Cache, optional): The cache to store the lists
+                in. Defaults to None, not stored.
+
+        Returns:
+            dict[datetime.date, dict]: The activity list of each date.
+        """
+        return await asyncio.to_thread(
+            _fetch_activities,
+            self.session,
+            f"{self.urls['base_url']}{self.urls['list']}",
+            _list_params(facility, min(dates), max(dates)),
+            self.headers,
+            cache,
+            dates,
+        )
+
+    async def stream_activities(
+        self,
+        facility: str,
+        yml_by_date: dict[datetime.date, list[dict]],
+    ) -> dict[datetime.date, dict]:
+        """
+        List a facility's activities while they are downloaded, keeping
+        only those that can match, see _stream_activities.
+
+        Returns:
+            dict[datetime.date, dict]:
+                The possibly matching activities of each date.
+        """
+        return await asyncio.to_thread(
+            _stream_activities,
+            self.session,
+            f"{self.urls['base_url']}{self.urls['list']}",
+            _list_params(facility, min(yml_by_date), max(yml_by_date)),
+            self.headers,
+            yml_by_date,
+        )
+
+    def prepare(
+        self,
+        activities_to_book: list[Feelgood_Activity],
+    ) -> list[tuple[requests.PreparedRequest, Feelgood_Activity]]:
+        """
+        Build and encode the booking requests ahead of the release, to
+        send with participate.
+
+        Returns:
+            list[tuple[requests.PreparedRequest, Feelgood_Activity]]:
+                The prepared requests paired with their activity.
+        """
+        prepared = _prepare_bookings(
+            self.session, self.headers, activities_to_book
+        )
+        if prepared:
+            self._merge_send_kwargs(prepared[0][0].url)
+        return prepared
+
+    async def participate(
+        self,
+        request: requests.PreparedRequest,
+        retry_interval: tuple[float, float] = (0.02, 0.05),
+        retry_window: float = 0.0,
+    ) -> tuple[requests.Response, int]:
+        """
+        Send a booking prepared with prepare, resending it while it is too
+        early, see _send_booking.
+
+        Args:
+            request (requests.PreparedRequest): The prepared booking.
+            retry_interval (tuple[float, float], optional): Bounds in
+                seconds of the random pause before resending.
+                Defaults to (0.02, 0.05).
+            retry_window (float, optional): Seconds after the first attempt
+                during which too early bookings are resent. Defaults to
+                0.0, not resent.
+
+        Returns:
+            tuple[requests.Response, int]: The last response and the number
+                of attempts.
+        """
+        self._merge_send_kwargs(request.url)
+        return await asyncio.to_thread(
+            _send_booking,
+            self.session,
+            request,
+            self._send_kwargs,
+            retry_interval,
+            retry_window,
+        )
+
+    def _merge_send_kwargs(self, url: str) -> None:
+        # Proxy and certificate settings of the environment, only looked
+        # up once so they are not on the booking path
+        if self._send_kwargs is None:
+            self._send_kwargs = self.session.merge_environment_settings(
+                url, {}, None, None, None
+            )
+
+    async def cancel(self, activity_id: str) -> requests.Response:
+        """
+        Cancel the booking of an activity.
+
+        Args:
+            activity_id (str): The feelgood id of the activity.
+
+        Returns:
+            requests.Response: The response from feelgood.
+        """
+        return await asyncio.to_thread(
+            _cancel, self.session, self.urls, self.headers, activity_id
+        )
+
+    async def logout(self, username: str) -> bool:
+        """
+        Log out the client's session.
+
+        Returns:
+            bool: True if logging out succeeded.
+        """
+        return await asyncio.to_thread(
+            _logout, self.session, self.urls, username
+        )
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.session.close)
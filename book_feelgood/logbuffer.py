@@ -0,0 +1,64 @@
+import threading
+
+from loguru import logger
+
+
+class Log_Buffer:
+    """
+    Stands in for the logger where time matters, like right around the
+    release. Log calls only store their message and arguments, formatting
+    and writing them is left to flush().
+
+    Messages use the logger's "{}" formatting, arguments that are callables
+    are called at flush, like with logger.opt(lazy=True).
+    """
+
+    def __init__(self) -> None:
+        self._records = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def log(self, level: str, message: str, *args) -> None:
+        """
+        Store a log call for later.
+
+        Args:
+            level (str): The loguru level name.
+            message (str): The message, with "{}" for every argument.
+            *args: The arguments of the message.
+        """
+        with self._lock:
+            self._records.append((level, message, args))
+
+    def debug(self, message: str, *args) -> None:
+        self.log("DEBUG", message, *args)
+
+    def info(self, message: str, *args) -> None:
+        self.log("INFO", message, *args)
+
+    def success(self, message: str, *args) -> None:
+        self.log("SUCCESS", message, *args)
+
+    def warning(self, message: str, *args) -> None:
+        self.log("WARNING", message, *args)
+
+    def error(self, message: str, *args) -> None:
+        self.log("ERROR", message, *args)
+
+    def flush(self) -> None:
+        """
+        Format and write every stored log call, in the order they were made.
+        """
+        with self._lock:
+            records, self._records = self._records, []
+        for level, message, args in records:
+            args = [arg() if callable(arg) else arg for arg in args]
+            logger.log(level, message, *args)
+
+    def __enter__(self) -> "Log_Buffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Timings:
+    """
+    Collects monotonic timestamps of the phases of a booking run and of
+    every booking request, relative to when the object was created.
+    """
+
+    def __init__(self) -> None:
+        self._wall = time.time()
+        self._origin = time.perf_counter()
+        self._phases = {}
+        self._requests = []
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        """
+        Seconds since the object was created, on the monotonic clock.
+        """
+        return time.perf_counter() - self._origin
+
+    def wall(self, t: float) -> float:
+        """
+        Convert a time from now() to a Unix timestamp.
+        """
+        return self._wall + t
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time the body of the with statement as the phase name.
+        """
+        start = self.now()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] = {
+                    "start": start,
+                    "duration": self.now() - start,
+                }
+
+    def set(self, key: str, value) -> None:
+        """
+        Record a single value of the run, like the clock offset.
+        """
+        with self._lock:
+            self._values[key] = value
+
+    def record_request(
+        self,
+        activity: str,
+        sent: float,
+        received: float,
+        attempts: int,
+        status_code: int,
+    ) -> None:
+        """
+        Record a booking request.
+
+        Args:
+            activity (str): Summary of the booked activity.
+            sent (float): now() when the first attempt was sent.
+            received (float): now() when the last answer was received.
+            attempts (int): Number of attempts the booking needed.
+            status_code (int): HTTP status of the last answer.
+        """
+        request = {
+            "activity": activity,
+            "sent": sent,
+            "received": received,
+            "duration": received - sent,
+            "attempts": attempts,
+            "status_code": status_code,
+        }
+        with self._lock:
+            target = self._values.get("target")
+            if target is not None:
+                request["offset"] = self.wall(sent) - target
+            self._requests.append(request)
+
+    def report(self) -> dict:
+        """
+        The collected timings as a JSON serializable dict.
+        """
+        with self._lock:
+            return {
+                "time": self._wall,
+                **self._values,
+                "phases": dict(self._phases),
+                "requests": list(self._requests),
+            }
+
+    def write(self, path: str) -> None:
+        """
+        Append the report as one JSON line to path.
+        """
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(self.report()) + "\n")
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from book_feelgood.book import (
+    Feelgood_Activity,
+    _booking_chains,
+    _calibrate_clock,
+    _chain_bookings,
+    _is_cancelled,
+    _is_full,
+    _match_by_date,
+    _mount_pool,
+    _parse_booking,
+    _post_bookings,
+    _read_cache,
+    _refreshed_matches,
+    _session_store,
+    _surplus_bookings,
+    _wait_for_release,
+    _wait_for_spots,
+    _yml_by_date,
+)
+from book_feelgood.client import Feelgood_Client
+from book_feelgood.logbuffer import Log_Buffer
+from book_feelgood.metrics import Timings
+from book_feelgood.parse import (
+    get_date,
+    initialize_multi_parser,
+    lazy_import,
+    load_activities,
+    load_config,
+    splash,
+)
+
+requests = lazy_import("requests")
+
+# Worker threads of the event loop, the blocking requests of every
+# account's calls, and their release waits, run on them at the same time
+MAX_WORKERS = 64
+
+LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
+    "<level>{level: <8}</level> | "
+    "<magenta>{extra[account]}</magenta> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+
+
+def book_many(
+    accounts: list[list[str]],
+    test: bool,
+    day_offset: str,
+) -> None:  # pragma: no cover
+    """
+    Book activities for several accounts at once. Every account runs its
+    own login, list, book and logout pipeline with its own session on a
+    shared event loop, so all accounts release their bookings at the same
+    instant.
+
+    Args:
+        accounts (list[list[str]]):
+            Username, password and activities file for each account.
+        test (bool): Flag indicating whether to run in test mode.
+        day_offset (str): The offset for the booking day.
+
+    Returns:
+        None
+    """
+    splash()
+    _setup_logging(accounts)
+    settings, urls, headers = load_config()
+
+    if test:
+        logger.info("---running as test, no booking will be made---")
+
+    codes = asyncio.run(
+        _run_accounts(accounts, test, day_offset, settings, urls, headers)
+    )
+
+    if any(codes):
+        exit(max(codes))
+
+
+async def _run_accounts(
+    accounts: list[list[str]],
+    test: bool,
+    day_offset: str,
+    settings: dict,
+    urls: dict,
+    headers: dict,
+) -> list[int]:
+    """
+    Run the booking pipeline of every account concurrently.
+
+    Returns:
+        list[int]: Exit code of each account's pipeline.
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    )
+    return await asyncio.gather(
+        *(
+            _run_account(
+                username,
+                password,
+                activities_file,
+                test,
+                day_offset,
+                settings,
+                urls,
+                headers,
+            )
+            for username, password, activities_file in accounts
+        )
+    )
+
+
+async def _run_account(
+    username: str,
+    password: str,
+    activities_file: str,
+    test: bool,
+    day_offset: str,
+    settings: dict,
+    urls: dict,
+    headers: dict,
+) -> int:
+    """
+    Run the booking pipeline for one account with every log record tagged
+    with the activities file, so that it ends up in the account's own log.
+
+    Returns:
+        int: Exit code of the pipeline, 1 if it raised.
+    """
+    with logger.contextualize(account=activities_file):
+        try:
+            activities = load_activities(f"activities/{activities_file}.yml")
+            logger.info(f"Using activities/{activities_file}.yml")
+            yml_by_date = _yml_by_date(
+                activities, day_offset or settings["day_offset"]
+            )
+            if not yml_by_date:
+                logger.success("No activities to book today, bye!")
+                return 0
+
+            timings = Timings()
+            store = _session_store(settings)
+            async with Feelgood_Client(urls, headers) as client:
+                with timings.phase("login"):
+                    logged_in = await client.login(username, password, store)
+                if not logged_in:
+                    return 8123
+                await _book_client_session(
+                    client, yml_by_date, test, settings, timings
+                )
+                timings.write(f"logs/{activities_file}.timings.jsonl")
+                if store is not None:
+                    # Stay logged in for the next run
+                    await asyncio.to_thread(
+                        store.save,
+                        username,
+                        password,
+                        client.session.cookies,
+                    )
+                else:
+                    # The accounts wait for their logout at the same time,
+                    # so the run takes the longest delay, not their sum
+                    low, high = settings["logout_delay"]
+                    await asyncio.sleep(random.randint(low, high))
+                    await client.logout(username)
+            return 0
+        except Exception:
+            logger.exception(f"Booking failed for {activities_file}")
+            return 1
+
+
+async def _book_client_session(
+    client: Feelgood_Client,
+    yml_by_date: dict[datetime.date, list[dict]],
+    test: bool,
+    settings: dict,
+    timings: Timings = None,
+) -> None:
+    """
+    Fetch the activity lists, match them and book the matches with a
+    logged in client, like _book_session does with a session. Every
+    request is awaited, so the accounts share one event loop.
+
+    Args:
+        client (Feelgood_Client): The logged in client.
+        yml_by_date (dict[datetime.date, list[dict]]):
+            The YAML activities to book on each date.
+        test (bool): Flag indicating whether to run in test mode.
+        settings (dict): The settings section of the config.
+        timings (Timings, optional): Collects the timings of the run.
+            Defaults to None.
+    """
+    timings = timings or Timings()
+    urls = client.urls
+    home_url = f"{urls['base_url']}{urls['home']}"
+
+    with timings.phase("list"):
+        refresh = None
+        if settings["stream_list"]:
+            lists = await client.stream_activities(
+                settings["facility"], yml_by_date
+            )
+        else:
+            lists, refresh = await _client_lists(
+                client, settings, list(yml_by_date)
+            )
+
+    with timings.phase("match"):
+        activities_to_book = _match_by_date(urls, yml_by_date, lists)
+    if refresh is not None and not activities_to_book:
+        # The cached lists may be missing a newly added activity
+        await asyncio.wait([refresh])
+        activities_to_book = _refreshed_matches(
+            refresh, urls, yml_by_date, activities_to_book
+        )
+        refresh = None
+    if not activities_to_book:
+        logger.warning("No matching activity was found.")
+        return
+
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    lead = 0.0
+    if not test:
+        _mount_pool(client.session, urls["base_url"], len(activities_to_book))
+        with timings.phase("calibrate"):
+            offset, latency = await asyncio.to_thread(
+                _calibrate_clock,
+                client.session,
+                home_url,
+                samples=int(settings["clock_samples"]),
+            )
+        timings.set("clock_offset", offset)
+        timings.set("latency", latency)
+        lead = offset + latency
+    if refresh is not None:
+        await asyncio.wait([refresh])
+        activities_to_book = _refreshed_matches(
+            refresh, urls, yml_by_date, activities_to_book
+        )
+    for activity_to_book in activities_to_book:
+        if activity_to_book.date > horizon:
+            logger.warning(f"Not bookable yet: {activity_to_book}")
+    bookings = await _client_bookings(
+        client,
+        test,
+        [fa for fa in activities_to_book if fa.date < horizon],
+        timings,
+        settings["fallback"],
+    )
+    bookings += await _client_bookings(
+        client,
+        test,
+        [fa for fa in activities_to_book if fa.date == horizon],
+        timings,
+        settings["fallback"],
+        release_time=settings["release_time"],
+        lead=lead,
+        warm_url=home_url,
+        warmup=float(settings["warmup_seconds"]),
+        retry_interval=settings["retry_interval"],
+        retry_window=float(settings["retry_window"]),
+    )
+    with timings.phase("parse"):
+        for booking in bookings:
+            _parse_booking(booking)
+    for surplus in _surplus_bookings(bookings):
+        try:
+            r = await client.cancel(surplus.id)
+        except requests.RequestException as e:
+            logger.error(f"Could not cancel surplus booking: {surplus}")
+            logger.error(f"{e=}")
+            continue
+        _is_cancelled(r, surplus)
+    # The waitlist polls for minutes, it keeps to one worker thread
+    await asyncio.to_thread(
+        _wait_for_spots,
+        client.session,
+        urls,
+        client.headers,
+        settings,
+        timings,
+        bookings,
+    )
+
+
+async def _client_lists(
+    client: Feelgood_Client,
+    settings: dict,
+    dates: list[datetime.date],
+) -> tuple[dict[datetime.date, dict], asyncio.Task | None]:
+    """
+    Get the activity list of each date from the cache, listing them with
+    the client if any is missing. Stale lists are returned as they are
+    while fresh ones are listed in a task.
+
+    Returns:
+        tuple[dict[datetime.date, dict], asyncio.Task | None]:
+            The activity list of each date, and the pending refresh of
+            them if they were stale.
+    """
+    cache, lists, fresh = _read_cache(settings, dates)
+    if None in lists.values():
+        lists = await client.list_activities(
+            settings["facility"], dates, cache
+        )
+        return lists, None
+    if not fresh:
+        # Use the stale lists for now and list new ones meanwhile
+        refresh = asyncio.create_task(
+            client.list_activities(settings["facility"], dates, cache)
+        )
+        return lists, refresh
+    return lists, None
+
+
+async def _client_bookings(
+    client: Feelgood_Client,
+    test: bool,
+    activities_to_book: list[Feelgood_Activity],
+    timings: Timings,
+    fallback: str = "speculative",
+    release_time: str = None,
+    lead: float = 0.0,
+    warm_url: str = None,
+    warmup: float = 2.0,
+    retry_interval: tuple[float, float] = (0.02, 0.05),
+    retry_window: float = 2.0,
+) -> list[tuple[requests.Response, Feelgood_Activity]]:
+    """
+    Wait for the release time once and then send every chain of bookings
+    concurrently with the client, like _post_bookings does with threads.
+    The arguments are those of _post_bookings.
+
+    Returns:
+        list[tuple[requests.Response, Feelgood_Activity]]:
+            The responses paired with their activity, in completion order.
+    """
+    if test:
+        # Only logs the bookings
+        return _post_bookings(True, {}, None, activities_to_book)
+    prepared = client.prepare(activities_to_book)
+    if not prepared:
+        return []
+    chains = [
+        [
+            (request, activity_to_book, activity_to_book.summary())
+            for request, activity_to_book in chain
+        ]
+        for chain in _booking_chains(prepared, fallback)
+    ]
+
+    bookings = []
+    # Log calls from the last wake-up until every answer is in are only
+    # formatted and written once the release window is over.
+    with Log_Buffer() as hot_log:
+        if release_time:
+            await asyncio.to_thread(
+                _wait_for_release,
+                client.session,
+                release_time,
+                lead,
+                warm_url,
+                warmup,
+                len(chains),
+                timings,
+                hot_log,
+            )
+        sends = [
+            _client_chain(client, chain, retry_interval, retry_window, timings)
+            for chain in chains
+        ]
+        for results in asyncio.as_completed(sends):
+            bookings += _chain_bookings(await results, hot_log)
+    return bookings
+
+
+async def _client_chain(
+    client: Feelgood_Client,
+    chain: list[tuple[requests.PreparedRequest, Feelgood_Activity, str]],
+    retry_interval: tuple[float, float],
+    retry_window: float,
+    timings: Timings,
+) -> list[tuple]:
+    """
+    Send the bookings of a chain one after the other, going on to the next
+    alternative only if the previous one was full.
+
+    Returns:
+        list[tuple]: (activity, response, attempts, error) of every booking
+            sent, see _chain_bookings.
+    """
+    results = []
+    for request, activity_to_book, summary in chain:
+        sent = timings.now()
+        try:
+            r, attempts = await client.participate(
+                request, retry_interval, retry_window
+            )
+        except requests.RequestException as e:
+            results.append((activity_to_book, None, None, e))
+            break
+        timings.record_request(
+            summary, sent, timings.now(), attempts, r.status_code
+        )
+        results.append((activity_to_book, r, attempts, None))
+        if not _is_full(r):
+            break
+    return results
+
+
+def _setup_logging(accounts: list[list[str]]) -> None:
+    """
+    Log to stdout with the account of every record, and to one log file
+    per account with only that account's records.
+
+    Args:
+        accounts (list[list[str]]):
+            Username, password and activities file for each account.
+    """
+    logger.remove()
+    logger.configure(extra={"account": "-"})
+    logger.add(sys.stdout, format=LOG_FORMAT, enqueue=True)
+    for _, _, activities_file in accounts:
+        logger.add(
+            f"logs/{activities_file}.log",
+            filter=_account_filter(activities_file),
+            enqueue=True,
+        )
+
+
+def _account_filter(activities_file: str):
+    """
+    Create a loguru filter that only lets through the records logged
+    while running the account using activities_file.
+    """
+
+    def _filter(record) -> bool:
+        return record["extra"].get("account") == activities_file
+
+    return _filter
+
+
+if __name__ == "__main__":
+    book_many(**initialize_multi_parser())
@@ -1,9 +1,44 @@
 import argparse
+import copy
 import datetime
+import importlib.util
+import json
+import os
+import sys
+from types import ModuleType
+from typing import Callable, TypedDict
 
 import yaml
 from loguru import logger
 
+# The C loader is several times faster, fall back if PyYAML lacks libyaml
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+COMPILED_DIR = os.path.join("cache", "compiled")
+
+# Version of the compiled snapshots, bump it whenever their layout or the
+# output of a compiler changes so older snapshots are compiled again
+COMPILED_FORMAT = 1
+
+# Compiled yaml files by path and snapshot directory, with their mtime
+_compiled = {}
+
+
+class Yml_Activity(TypedDict, total=False):
+    """
+    An activity from an activities file, validated and with its day
+    resolved to an ISO weekday. Ranked alternatives of an activity share
+    its group, the activity itself has rank 0.
+    """
+
+    name: str
+    time: str
+    day: str
+    weekday: int
+    start_time: str
+    group: int
+    rank: int
+
 
 def initialize_parser(arg_list: list[str] = None) -> dict:
     """
@@ -64,7 +99,7 @@ def initialize_parser(arg_list: list[str] = None) -> dict:
     parser.add_argument(
         "-do",
         "--day-offset",
-        help="Add optional offset day in place of config",
+        help="Add optional offset day, or range like 1..6, in place of config",
         required=False,
     )
 
@@ -80,6 +115,43 @@ def initialize_parser(arg_list: list[str] = None) -> dict:
     return vars(parsed)
 
 
+def initialize_multi_parser(arg_list: list[str] = None) -> dict:
+    """
+    Needed input arguments for booking several accounts in one process
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "-acc",
+        "--account",
+        nargs=3,
+        action="append",
+        metavar=("USERNAME", "PASSWORD", "ACTIVITIES_FILE"),
+        dest="accounts",
+        help="Feelgood login and activities.yml file, repeat per account",
+        required=True,
+    )
+
+    parser.add_argument(
+        "-tst",
+        "--test",
+        action=argparse.BooleanOptionalAction,
+        help="Do a dry run",
+        required=False,
+    )
+
+    parser.add_argument(
+        "-do",
+        "--day-offset",
+        help="Add optional offset day, or range like 1..6, in place of config",
+        required=False,
+    )
+
+    parsed = parser.parse_args(arg_list)
+
+    return vars(parsed)
+
+
 def parse_day(day: int | str) -> int | str:
     """
     Converts a day between its numerical and textual representations.
@@ -146,6 +218,38 @@ def parse_day(day: int | str) -> int | str:
     return day_parsed
 
 
+def parse_day_offset(day_offset: int | str) -> list[int]:
+    """
+    Parse a day offset, either a single offset or an inclusive range of
+    offsets written as "first..last".
+
+    Args:
+        day_offset (int | str): The offset, e.g. 6, "6" or "1..6".
+
+    Returns:
+        list[int]: The offsets in increasing order.
+
+    Raises:
+        ValueError: If the input cannot be parsed as an offset or a range.
+    """
+    if isinstance(day_offset, int):
+        return [day_offset]
+
+    first, sep, last = day_offset.partition("..")
+    try:
+        if not sep:
+            return [int(first)]
+        offsets = list(range(int(first), int(last) + 1))
+    except ValueError:
+        offsets = []
+    if not offsets:
+        raise ValueError(
+            f"Could not parse input as a day offset: {day_offset}"
+        )
+
+    return offsets
+
+
 def read_yaml(filename: str) -> dict:
     """
     Reads yaml file and returns the dictionary
@@ -158,13 +262,228 @@ def read_yaml(filename: str) -> dict:
     """
     try:
         with open(filename, "r", encoding="utf-8") as file:
-            yaml_blob = yaml.safe_load(file)
+            yaml_blob = yaml.load(file, Loader=YAML_LOADER)
 
             return yaml_blob
     except Exception as e:
         raise e
 
 
+def read_yaml_compiled(
+    filename: str,
+    compiled_dir: str = None,
+    compiler: Callable[[dict, str], dict] = None,
+):
+    """
+    Reads yaml file through a JSON snapshot of it, which is much faster to
+    load, and keeps it in memory after that. Both are renewed whenever the
+    yaml file's modification time changes, snapshots also when they were
+    made with another COMPILED_FORMAT or compiler. Every call gets its own
+    copy, so changing it does not change what later calls get.
+
+        Args:
+            filename: The name of the yaml file to read
+            compiled_dir: Directory to keep the snapshots in, defaults to
+                COMPILED_DIR
+            compiler: Validates and converts the yaml blob before it is
+                stored, called with the blob and the file name
+
+        Returns:
+            Dictionary with the (compiled) yaml blob
+    """
+    if compiled_dir is None:
+        compiled_dir = COMPILED_DIR
+    mtime = os.stat(filename).st_mtime_ns
+    key = (filename, compiled_dir)
+    if key in _compiled and _compiled[key][0] == mtime:
+        return copy.deepcopy(_compiled[key][1])
+    snapshot = os.path.join(
+        compiled_dir, filename.replace(os.sep, "_").replace("/", "_")
+    )
+    snapshot = f"{snapshot}.json"
+    version = {
+        "format": COMPILED_FORMAT,
+        "compiler": getattr(compiler, "__qualname__", None),
+        "mtime": mtime,
+    }
+    try:
+        with open(snapshot, "r", encoding="utf-8") as file:
+            compiled = json.load(file)
+        if all(compiled[field] == value for field, value in version.items()):
+            _compiled[key] = (mtime, compiled["blob"])
+            return copy.deepcopy(compiled["blob"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    yaml_blob = read_yaml(filename)
+    if compiler is not None:
+        yaml_blob = compiler(yaml_blob, filename)
+    _compiled[key] = (mtime, yaml_blob)
+    tmp_snapshot = f"{snapshot}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(compiled_dir, exist_ok=True)
+        with open(tmp_snapshot, "w", encoding="utf-8") as file:
+            json.dump({**version, "blob": yaml_blob}, file)
+        os.replace(tmp_snapshot, snapshot)
+    except (OSError, TypeError, ValueError) as e:
+        # Not everything yaml can hold fits in JSON, just skip the snapshot
+        logger.debug(f"Could not compile {filename}: {e=}")
+        if os.path.exists(tmp_snapshot):
+            os.remove(tmp_snapshot)
+    return copy.deepcopy(yaml_blob)
+
+
+def load_activities(filename: str) -> dict:
+    """
+    Reads an activities file, validated and compiled once per change of
+    the file.
+
+        Args:
+            filename: The name of the activities file
+
+        Returns:
+            Dictionary with the compiled activities
+
+        Raises:
+            ValueError: If an activity in the file is not valid.
+    """
+    return read_yaml_compiled(
+        filename,
+        os.path.join(COMPILED_DIR, "activities"),
+        compile_activities,
+    )
+
+
+def compile_activities(activities: dict, source: str = "") -> dict:
+    """
+    Validate an activities blob and resolve the day of each activity to
+    its ISO weekday, so nothing is left to fail later in the run. Ranked
+    alternatives of an activity follow it in the list, each marked with
+    the group and rank it has in it.
+
+        Args:
+            activities: The activities blob as read from yaml
+            source: Where the blob came from, for the error messages
+
+        Returns:
+            Dictionary with the activities as Yml_Activity
+
+        Raises:
+            ValueError: If an activity is not valid.
+    """
+    if not isinstance(activities, dict) or not isinstance(
+        activities.get("activities"), list
+    ):
+        raise ValueError(f"No list of activities in {source}")
+
+    compiled = []
+    for i, yml_act in enumerate(activities["activities"]):
+        where = f"{source} activity {i + 1}"
+        if not isinstance(yml_act, dict):
+            raise ValueError(f"Not an activity in {where}: {yml_act}")
+        yml_activity = _compile_activity(yml_act, where)
+        compiled.append(yml_activity)
+
+        alternatives = yml_act.get("alternatives", [])
+        if not isinstance(alternatives, list):
+            raise ValueError(f"Alternatives are not a list in {where}")
+        if alternatives:
+            yml_activity["group"] = i
+            yml_activity["rank"] = 0
+        for rank, alternative in enumerate(alternatives, start=1):
+            alt_where = f"{where} alternative {rank}"
+            if not isinstance(alternative, dict):
+                raise ValueError(f"Not an activity in {alt_where}")
+            # Alternatives are on the same day, anything else left out is
+            # the same as for the activity itself
+            inherited = {
+                key: yml_act[key]
+                for key in ("name", "time", "start_time")
+                if key in yml_act
+            }
+            alt_activity = _compile_activity(
+                {**inherited, **alternative, "day": yml_act["day"]}, alt_where
+            )
+            alt_activity["group"] = i
+            alt_activity["rank"] = rank
+            compiled.append(alt_activity)
+
+    return {"activities": compiled}
+
+
+def _compile_activity(yml_act: dict, where: str) -> Yml_Activity:
+    """
+    Validate a single activity and resolve its day.
+    """
+    for field in ("name", "time", "day"):
+        if not isinstance(yml_act.get(field), str) or not yml_act[field]:
+            raise ValueError(
+                f"Missing or not quoted {field} in {where}: {yml_act}"
+            )
+    _check_clock(yml_act["time"], "time", where, partial=True)
+
+    yml_activity = Yml_Activity(
+        name=yml_act["name"],
+        time=yml_act["time"],
+        day=yml_act["day"],
+        weekday=parse_day(yml_act["day"]),
+    )
+    if "start_time" in yml_act:
+        start_time = yml_act["start_time"]
+        if not isinstance(start_time, str):
+            raise ValueError(f"Start time not quoted in {where}")
+        _check_clock(start_time, "start time", where)
+        yml_activity["start_time"] = start_time
+    return yml_activity
+
+
+def _check_clock(
+    clock: str,
+    what: str,
+    where: str,
+    partial: bool = False,
+) -> None:
+    """
+    Check that a time is a valid "HH:MM". With partial, anything that is
+    not shaped like "HH:MM" is let through, as activity times are also
+    matched as substrings of the remote start.
+    """
+    hours, _, minutes = clock.partition(":")
+    shaped = len(clock) == 5 and clock[2] == ":"
+    if partial and not shaped:
+        return
+    if (
+        not shaped
+        or not (hours.isdigit() and minutes.isdigit())
+        or int(hours) > 23
+        or int(minutes) > 59
+    ):
+        raise ValueError(f"Invalid {what} in {where}: {clock}")
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module lazily, it is only executed when one of its
+    attributes is first used. Keeps heavy imports off the start-up path of
+    runs that never need them.
+
+        Args:
+            name: The name of the module
+
+        Returns:
+            The module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
 def log_dict(dictionary: dict, indent: int = 0):
     """
     Log the contents of a dictionary recursively, with optional indentation.
@@ -209,10 +528,10 @@ def get_date(day_offset: int) -> datetime.date:
 
 
 def splash():
-    banner = read_yaml("config/banner.yml")
+    banner = read_yaml_compiled("config/banner.yml")
     logger.success(banner["banner"])
 
 
 def load_config():
-    config = read_yaml("config/config.yml")
+    config = read_yaml_compiled("config/config.yml")
     return (config["settings"], config["urls"], config["headers"])
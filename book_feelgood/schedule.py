@@ -0,0 +1,92 @@
+from typing import NamedTuple
+
+# The fields of an activity record whose changes are reported
+FIELDS = ("start", "max_participants", "participants")
+
+
+class Schedule_Diff(NamedTuple):
+    """
+    The changes between two fetches of an activity list. Records are the
+    remote activity records, changed ones are paired as (old, new).
+    """
+
+    added: list[dict]
+    removed: list[dict]
+    changed: list[tuple[dict, dict]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+class Schedule_Snapshot:
+    """
+    The activities of a fetched activity list by their Activity.id, to
+    compare the next fetch of the same list with. Only the deltas have to
+    be matched or acted on then, instead of the whole list.
+    """
+
+    def __init__(self, feelgood_activities: dict = None) -> None:
+        self._records = {}
+        if feelgood_activities is not None:
+            self.update(feelgood_activities)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, activity_id: str) -> bool:
+        return activity_id in self._records
+
+    def get(self, activity_id: str) -> dict | None:
+        """
+        The remote record of an activity, None if it is not in the list.
+        """
+        entry = self._records.get(activity_id)
+        return entry[1] if entry is not None else None
+
+    def update(self, feelgood_activities: dict) -> Schedule_Diff:
+        """
+        Replace the snapshot with a newer fetch of the list.
+
+        Args:
+            feelgood_activities (dict):
+                The activity list as returned by feelgood.
+
+        Returns:
+            Schedule_Diff: What was added, removed or changed in start,
+                capacity or booked count since the previous fetch.
+        """
+        records = {}
+        added = []
+        changed = []
+        for f_act in feelgood_activities["activities"]:
+            activity = f_act["Activity"]
+            key = tuple(activity.get(field) for field in FIELDS)
+            records[activity["id"]] = (key, f_act)
+            previous = self._records.get(activity["id"])
+            if previous is None:
+                added.append(f_act)
+            elif previous[0] != key:
+                changed.append((previous[1], f_act))
+        removed = [
+            f_act
+            for activity_id, (_, f_act) in self._records.items()
+            if activity_id not in records
+        ]
+        self._records = records
+        return Schedule_Diff(added, removed, changed)
+
+    def forget(self, activity_id: str) -> None:
+        """
+        Drop an activity, so the next update reports it as added again.
+        """
+        self._records.pop(activity_id, None)
+
+
+def free_spots(f_act: dict) -> int:
+    """
+    The number of spots left of a remote activity record.
+    """
+    activity = f_act["Activity"]
+    return activity.get("max_participants", 0) - activity.get(
+        "participants", 0
+    )
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from book_feelgood.book import (
+    _book_session,
+    _resume_or_login,
+    _session_store,
+    _session_valid,
+    _yml_by_date,
+)
+from book_feelgood.metrics import Timings
+from book_feelgood.multi import _setup_logging
+from book_feelgood.parse import (
+    lazy_import,
+    load_activities,
+    load_config,
+    splash,
+)
+
+requests = lazy_import("requests")
+
+if TYPE_CHECKING:
+    from book_feelgood.sessions import Session_Store
+
+
+class Activities_Watcher:
+    """
+    Keeps the last good version of every activities file. Reparsing only
+    when a file changed is left to load_activities, a file that fails to
+    parse after a change keeps its last good version.
+    """
+
+    def __init__(self, directory: str = "activities") -> None:
+        self._directory = directory
+        self._files = {}
+        self._errors = {}
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def get(self, activities_file: str) -> dict:
+        """
+        Get the parsed activities file, reparsing it if it changed.
+
+        Args:
+            activities_file (str): The name of the file, without .yml.
+
+        Returns:
+            dict: The activities blob, the last good one if the changed
+                file could not be parsed.
+
+        Raises:
+            Exception: If the file could not be read or parsed, and there
+                is no earlier version of it.
+        """
+        path = os.path.join(self.directory, f"{activities_file}.yml")
+        last_good = self._files.get(activities_file)
+        try:
+            activities = load_activities(path)
+        except Exception as e:
+            if last_good is None:
+                raise
+            # Only report a broken edit once, not on every refresh
+            if self._errors.get(activities_file) != repr(e):
+                self._errors[activities_file] = repr(e)
+                logger.error(f"Could not reload {activities_file}: {e=}")
+                logger.warning(f"Keeping the last good version of {path}")
+            return last_good
+        self._errors.pop(activities_file, None)
+        if last_good is not None and activities != last_good:
+            logger.info(f"Reloaded {path}")
+        self._files[activities_file] = activities
+        return activities
+
+    def refresh(self) -> None:
+        """
+        Reparse every watched file that changed since it was last read.
+        """
+        for activities_file in list(self._files):
+            self.get(activities_file)
+
+
+def serve(
+    accounts: list[list[str]],
+    test: bool,
+    day_offset: str,
+) -> None:  # pragma: no cover
+    """
+    Run as a daemon that books for every account each day at the release
+    time. Config and activities are loaded up front and sessions are kept
+    between runs, so nothing expensive is left for the release.
+
+    Args:
+        accounts (list[list[str]]):
+            Username, password and activities file for each account.
+        test (bool): Flag indicating whether to run in test mode.
+        day_offset (str): The offset for the booking day.
+
+    Returns:
+        None
+    """
+    splash()
+    _setup_logging(accounts)
+    settings, urls, headers = load_config()
+    if test:
+        logger.info("---running as test, no booking will be made---")
+
+    watcher = Activities_Watcher()
+    for _, _, activities_file in accounts:
+        watcher.get(activities_file)
+    store = _session_store(settings)
+    sessions = {username: requests.session() for username, _, _ in accounts}
+
+    while True:
+        run_at = _next_run(
+            datetime.datetime.now(),
+            settings["release_time"],
+            float(settings["serve_lead"]),
+        )
+        logger.info(f"Next booking run at {run_at}")
+        while (run_at - datetime.datetime.now()).total_seconds() > 0:
+            remaining = (run_at - datetime.datetime.now()).total_seconds()
+            time.sleep(min(float(settings["serve_poll"]), remaining))
+            watcher.refresh()
+
+        with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+            for username, password, activities_file in accounts:
+                executor.submit(
+                    _serve_account,
+                    sessions[username],
+                    username,
+                    password,
+                    watcher.get(activities_file),
+                    activities_file,
+                    test,
+                    day_offset,
+                    settings,
+                    urls,
+                    headers,
+                    store,
+                )
+
+
+def _serve_account(
+    s: requests.session,
+    username: str,
+    password: str,
+    activities: dict,
+    activities_file: str,
+    test: bool,
+    day_offset: str,
+    settings: dict,
+    urls: dict,
+    headers: dict,
+    store: Session_Store = None,
+) -> None:
+    """
+    Book today's activities with an account's long-lived session. The
+    session is reused while it is logged in, otherwise the stored session
+    is resumed or the account logs in again.
+    """
+    with logger.contextualize(account=activities_file):
+        try:
+            yml_by_date = _yml_by_date(
+                activities, day_offset or settings["day_offset"]
+            )
+            if not yml_by_date:
+                logger.success("No activities to book today")
+                return
+            timings = Timings()
+            with timings.phase("login"):
+                logged_in = bool(s.cookies) and _session_valid(s, urls)
+                if not logged_in:
+                    logged_in = _resume_or_login(
+                        s, urls, username, password, store
+                    )
+            if logged_in:
+                _book_session(
+                    s, yml_by_date, test, settings, urls, headers, timings
+                )
+                timings.write(f"logs/{activities_file}.timings.jsonl")
+                if store is not None:
+                    store.save(username, password, s.cookies)
+        except Exception:
+            logger.exception(f"Booking failed for {activities_file}")
+
+
+def _next_run(
+    now: datetime.datetime,
+    release_time: str,
+    lead: float,
+) -> datetime.datetime:
+    """
+    Get the next time to start a booking run, lead seconds before the
+    release time today, or tomorrow if that has already passed.
+
+    Args:
+        now (datetime.datetime): The current time.
+        release_time (str): The time, "HH:MM:SS", when booking opens.
+        lead (float): Seconds before the release to start the run.
+
+    Returns:
+        datetime.datetime: When to start the next run.
+    """
+    release = datetime.datetime.combine(
+        now.date(), datetime.time.fromisoformat(release_time)
+    )
+    run_at = release - datetime.timedelta(seconds=lead)
+    if run_at <= now:
+        run_at += datetime.timedelta(days=1)
+    return run_at
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from book_feelgood.parse import lazy_import
+
+if TYPE_CHECKING:
+    from requests.cookies import RequestsCookieJar
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+except ImportError:  # pragma: no cover
+    Fernet = None
+
+requests = lazy_import("requests")
+
+SALT_BYTES = 16
+KDF_ITERATIONS = 200_000
+
+
+class Session_Store:
+    """
+    On-disk store of the login cookies of each username, encrypted with a
+    key derived from the account's password, so a later run can reuse the
+    login instead of posting the credentials again.
+
+    Needs the optional cryptography package, see available().
+    """
+
+    def __init__(self, directory: str = "cache/sessions") -> None:
+        if not self.available():
+            raise RuntimeError(
+                "Storing sessions needs cryptography, "
+                "install book_feelgood[sessions]"
+            )
+        self._directory = Path(directory)
+
+    @staticmethod
+    def available() -> bool:
+        """
+        Check if the cryptography package is installed.
+        """
+        return Fernet is not None
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def _path(self, username: str) -> Path:
+        # Keep the email addresses out of the file names
+        digest = hashlib.sha256(username.encode()).hexdigest()[:16]
+        return self.directory / f"{digest}.session"
+
+    @staticmethod
+    def _fernet(password: str, salt: bytes) -> "Fernet":
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=KDF_ITERATIONS,
+        )
+        return Fernet(base64.urlsafe_b64encode(kdf.derive(password.encode())))
+
+    def load(
+        self,
+        username: str,
+        password: str,
+    ) -> RequestsCookieJar | None:
+        """
+        Load the stored cookies of a username.
+
+        Args:
+            username (str): The username the cookies belong to.
+            password (str): The password of the username.
+
+        Returns:
+            RequestsCookieJar | None: The cookies, None if there are none
+                or they could not be decrypted.
+        """
+        path = self._path(username)
+        try:
+            blob = path.read_bytes()
+            fernet = self._fernet(password, blob[:SALT_BYTES])
+            cookies = json.loads(fernet.decrypt(blob[SALT_BYTES:]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, InvalidToken) as e:
+            logger.warning(f"Could not read the stored session: {e=}")
+            return None
+
+        jar = requests.cookies.RequestsCookieJar()
+        for cookie in cookies:
+            jar.set_cookie(requests.cookies.create_cookie(**cookie))
+        return jar
+
+    def save(
+        self,
+        username: str,
+        password: str,
+        jar: RequestsCookieJar,
+    ) -> None:
+        """
+        Store the cookies of a username, readable only by the owner.
+
+        Args:
+            username (str): The username the cookies belong to.
+            password (str): The password of the username.
+            jar (RequestsCookieJar): The cookies of the logged in session.
+        """
+        cookies = [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+                "expires": cookie.expires,
+            }
+            for cookie in jar
+        ]
+        salt = os.urandom(SALT_BYTES)
+        token = self._fernet(password, salt).encrypt(
+            json.dumps(cookies).encode()
+        )
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(username)
+        # Write to a temporary file first so readers never see half a file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as file:
+            file.write(salt + token)
+        os.replace(tmp_path, path)
+
+    def clear(self, username: str) -> None:
+        """
+        Remove the stored cookies of a username.
+        """
+        self._path(username).unlink(missing_ok=True)
@@ -0,0 +1,275 @@
+import argparse
+import hashlib
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+
+class Feelgood_Standin:
+    """
+    Local in-process stand-in for the feelgood API, for testing the
+    booking pipeline offline.
+
+    Serves login on "/", users/start, users/logout,
+    w_booking/activities/list, w_booking/activities/participate/<id> and
+    .../cancel/<id>/1 like the urls in config/config.yml. Bookings before
+    the release time are answered with ACTIVITY_BOOKING_TO_EARLY, full
+    activities with ACTIVITY_FULL and double bookings with
+    USER_ALREADY_BOOKED. The list has an ETag and is answered with 304
+    when it did not change. Every request can be delayed by a fixed
+    latency and any activity can be set to answer with a given error code.
+    """
+
+    def __init__(
+        self,
+        release: float = 0.0,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.release = release
+        self.latency = latency
+        self.activities = {}
+        self.errors = {}
+        self.sessions = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def urls(self):
+        return {
+            "base_url": self.base_url,
+            "home": "users/start",
+            "logout": "users/logout",
+            "participate": "w_booking/activities/participate/",
+            "cancel": "w_booking/activities/cancel/",
+            "list": "w_booking/activities/list",
+        }
+
+    def add_activity(
+        self,
+        activity_id: str,
+        name: str,
+        start: str,
+        capacity: int = 1,
+    ) -> None:
+        """
+        Add an activity to the schedule.
+
+        Args:
+            activity_id (str): The id used in the participate url.
+            name (str): The activity type name.
+            start (str): The start, "YYYY-MM-DD HH:MM:SS".
+            capacity (int, optional): Number of spots. Defaults to 1.
+        """
+        with self._lock:
+            self.activities[activity_id] = {
+                "ActivityType": {"name": name},
+                "Activity": {
+                    "id": activity_id,
+                    "start": start,
+                    "max_participants": capacity,
+                    "participants": 0,
+                },
+                "booked_by": [],
+            }
+
+    def booked_by(self, activity_id: str) -> list[str]:
+        """
+        The users that booked an activity, in booking order.
+        """
+        with self._lock:
+            return list(self.activities[activity_id]["booked_by"])
+
+    def start(self) -> "Feelgood_Standin":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "Feelgood_Standin":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _login(self, body: dict) -> tuple[int, dict, str]:
+        email = body.get("User", {}).get("email")
+        if not email or not body["User"].get("password"):
+            return 401, {"message": "Fel e-post eller lösenord"}, None
+        token = secrets.token_hex(8)
+        with self._lock:
+            self.sessions[token] = email
+        return 200, {"result": "ok"}, token
+
+    def _list(self, query: dict) -> tuple[int, dict]:
+        date_from = query.get("from", [""])[0]
+        date_to = query.get("to", [""])[0]
+        with self._lock:
+            activities = [
+                {
+                    "ActivityType": dict(act["ActivityType"]),
+                    "Activity": dict(act["Activity"]),
+                }
+                for act in self.activities.values()
+                if date_from <= act["Activity"]["start"][:10] <= date_to
+            ]
+        return 200, {"activities": activities}
+
+    def _participate(self, user: str, activity_id: str) -> tuple[int, dict]:
+        if time.time() < self.release:
+            return 200, {"error_code": "ACTIVITY_BOOKING_TO_EARLY"}
+        with self._lock:
+            if activity_id in self.errors:
+                return 200, {"error_code": self.errors[activity_id]}
+            act = self.activities.get(activity_id)
+            if act is None:
+                return 404, {"message": "Not found"}
+            if user in act["booked_by"]:
+                return 200, {"error_code": "USER_ALREADY_BOOKED"}
+            activity = act["Activity"]
+            if activity["participants"] >= activity["max_participants"]:
+                return 200, {"error_code": "ACTIVITY_FULL"}
+            activity["participants"] += 1
+            act["booked_by"].append(user)
+        return 200, {"result": "ok"}
+
+    def _cancel(self, user: str, activity_id: str) -> tuple[int, dict]:
+        with self._lock:
+            act = self.activities.get(activity_id)
+            if act is None or user not in act["booked_by"]:
+                return 404, {"message": "Not found"}
+            act["booked_by"].remove(user)
+            act["Activity"]["participants"] -= 1
+        return 200, {"result": "ok"}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.trace(format % args)
+
+            def _user(self) -> str:
+                cookie = self.headers.get("Cookie", "")
+                for part in cookie.split(";"):
+                    key, _, value = part.strip().partition("=")
+                    if key == "session":
+                        return standin.sessions.get(value)
+                return None
+
+            def _reply(self, status, body=None, token=None, etag=None):
+                payload = json.dumps(body).encode() if body else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if etag:
+                    self.send_header("ETag", etag)
+                if token:
+                    self.send_header("Set-Cookie", f"session={token}; Path=/")
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            def _handle(self):
+                received = time.time()
+                if standin.latency:
+                    time.sleep(standin.latency)
+                url = urlsplit(self.path)
+                path = url.path.strip("/")
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length else b""
+                with standin._lock:
+                    standin.requests.append((received, self.command, path))
+
+                user = self._user()
+                if self.command == "HEAD":
+                    return self._reply(200)
+                if self.command == "POST" and path == "":
+                    return self._reply(*standin._login(json.loads(raw)))
+                if user is None:
+                    return self._reply(403, {"message": "Not logged in"})
+                if path == "users/logout":
+                    with standin._lock:
+                        standin.sessions = {
+                            token: email
+                            for token, email in standin.sessions.items()
+                            if email != user
+                        }
+                    return self._reply(200, {"result": "ok"})
+                if path == "users/start":
+                    return self._reply(200, {"result": "ok"})
+                if path == "w_booking/activities/list":
+                    status, body = standin._list(parse_qs(url.query))
+                    etag = hashlib.sha1(
+                        json.dumps(body, sort_keys=True).encode()
+                    ).hexdigest()
+                    etag = f'"{etag}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._reply(304, etag=etag)
+                    return self._reply(status, body, etag=etag)
+                prefix, _, activity_id = path.rpartition("/")
+                if prefix == "w_booking/activities/participate":
+                    return self._reply(
+                        *standin._participate(user, activity_id)
+                    )
+                prefix, _, rest = path.partition("/cancel/")
+                if prefix == "w_booking/activities" and rest.endswith("/1"):
+                    return self._reply(*standin._cancel(user, rest[:-2]))
+                return self._reply(404, {"message": "Not found"})
+
+            do_GET = _handle
+            do_POST = _handle
+            do_HEAD = _handle
+
+        return Handler
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--release-in",
+        type=float,
+        default=0.0,
+        help="Seconds from now until booking opens",
+    )
+    parser.add_argument(
+        "--activity",
+        nargs=4,
+        action="append",
+        default=[],
+        metavar=("ID", "NAME", "START", "CAPACITY"),
+        help="Activity to serve, repeat per activity",
+    )
+    args = parser.parse_args()
+    standin = Feelgood_Standin(
+        release=time.time() + args.release_in,
+        latency=args.latency,
+        port=args.port,
+    )
+    for activity_id, name, start, capacity in args.activity:
+        standin.add_activity(activity_id, name, start, int(capacity))
+    logger.info(f"Feelgood stand-in at {standin.base_url}")
+    standin._server.serve_forever()
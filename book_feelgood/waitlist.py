@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import datetime
+import random
+import time
+
+from loguru import logger
+
+from book_feelgood.book import (
+    Feelgood_Activity,
+    _is_booked,
+    _is_full,
+    _list_params,
+    _prepare_bookings,
+)
+from book_feelgood.metrics import Timings
+from book_feelgood.parse import lazy_import
+from book_feelgood.schedule import Schedule_Snapshot, free_spots
+
+requests = lazy_import("requests")
+
+
+class Waitlist:
+    """
+    Watches fully booked activities by polling the activity list of their
+    dates, and books an activity as soon as the list shows a free spot.
+
+    The list is fetched with conditional requests, so an unchanged list
+    costs a 304 without a body when the server supports it. Every list is
+    compared with the previous poll of it, a booking is only attempted
+    when a watched activity changed and has a free spot.
+
+    Boka activities are not watched, their time slots are not reflected in
+    the capacity of the list.
+    """
+
+    def __init__(
+        self,
+        s: requests.session,
+        urls: dict,
+        headers: dict,
+        facility: str,
+        timings: Timings = None,
+    ) -> None:
+        self._s = s
+        self._urls = urls
+        self._headers = headers
+        self._facility = facility
+        self._timings = timings or Timings()
+        self._watched = {}
+        self._snapshots = {}
+        self._validators = {}
+
+    @property
+    def watched(self) -> list[Feelgood_Activity]:
+        return list(self._watched)
+
+    def watch(self, activities: list[Feelgood_Activity]) -> None:
+        """
+        Start watching activities, their bookings are prepared right away.
+
+        Args:
+            activities (list[Feelgood_Activity]): The full activities.
+        """
+        watchable = []
+        for activity in activities:
+            if "Boka" in activity.name:
+                logger.info(f"Not watching Boka activity: {activity}")
+            else:
+                watchable.append(activity)
+        prepared = _prepare_bookings(self._s, self._headers, watchable)
+        for request, activity in prepared:
+            logger.info(f"Watching for a free spot: {activity}")
+            self._watched[activity] = request
+
+    def poll(self) -> list[tuple[requests.Response, Feelgood_Activity]]:
+        """
+        Fetch the lists of the watched dates once and try to book every
+        watched activity that got a free spot.
+
+        Returns:
+            list[tuple[requests.Response, Feelgood_Activity]]:
+                The booking attempts made, paired with their activity.
+        """
+        bookings = []
+        for date in sorted({a.date for a in self.watched}):
+            feelgood_activities = self._fetch(date)
+            if feelgood_activities is None:
+                continue
+            for activity in self._freed(date, feelgood_activities):
+                if activity not in self._watched:
+                    # An alternative of it was booked in this poll
+                    continue
+                booking = self._book(activity)
+                if booking is not None:
+                    bookings.append(booking)
+        return bookings
+
+    def run(
+        self,
+        duration: float,
+        interval: float,
+        jitter: float = 0.0,
+    ) -> list[tuple[requests.Response, Feelgood_Activity]]:
+        """
+        Poll until every watched activity is booked or duration is over.
+
+        Args:
+            duration (float): Seconds to keep polling.
+            interval (float): Seconds between polls.
+            jitter (float, optional): Fraction of interval to randomly
+                lengthen or shorten every pause with. Defaults to 0.0.
+
+        Returns:
+            list[tuple[requests.Response, Feelgood_Activity]]:
+                The booking attempts made, paired with their activity.
+        """
+        deadline = time.monotonic() + duration
+        bookings = []
+        with self._timings.phase("waitlist"):
+            while self._watched and time.monotonic() < deadline:
+                try:
+                    bookings += self.poll()
+                except requests.RequestException as e:
+                    logger.warning(f"Waitlist poll failed: {e=}")
+                if not self._watched:
+                    break
+                pause = interval * (1 + random.uniform(-jitter, jitter))
+                time.sleep(max(0.0, min(pause, deadline - time.monotonic())))
+        for activity in self.watched:
+            logger.warning(f"No spot freed up: {activity}")
+        return bookings
+
+    def _fetch(self, date: datetime.date) -> dict | None:
+        """
+        Fetch the activity list of a date, None if it did not change.
+        """
+        headers = dict(self._headers)
+        etag, last_modified = self._validators.get(date, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        r = self._s.get(
+            f"{self._urls['base_url']}{self._urls['list']}",
+            params=_list_params(self._facility, date, date),
+            headers=headers,
+        )
+        if r.status_code == 304:
+            return None
+        r.raise_for_status()
+        self._validators[date] = (
+            r.headers.get("ETag"),
+            r.headers.get("Last-Modified"),
+        )
+        return r.json()
+
+    def _freed(
+        self,
+        date: datetime.date,
+        feelgood_activities: dict,
+    ) -> list[Feelgood_Activity]:
+        """
+        Compare the list of a date with the previous poll of it.
+
+        Returns:
+            list[Feelgood_Activity]: The watched activities that are new or
+                changed in the list and have a free spot.
+        """
+        snapshot = self._snapshots.setdefault(date, Schedule_Snapshot())
+        diff = snapshot.update(feelgood_activities)
+        updated = diff.added + [new for _, new in diff.changed]
+        freed = {
+            f_act["Activity"]["id"]
+            for f_act in updated
+            if free_spots(f_act) > 0
+        }
+        return [activity for activity in self._watched if activity.id in freed]
+
+    def _book(
+        self,
+        activity: Feelgood_Activity,
+    ) -> tuple[requests.Response, Feelgood_Activity] | None:
+        """
+        Send the prepared booking of a watched activity. A booked activity
+        is no longer watched, and neither are its alternatives.
+        """
+        request = self._watched[activity]
+        sent = self._timings.now()
+        try:
+            r = self._s.send(request)
+        except requests.RequestException as e:
+            logger.error(f"Waitlist booking failed: {activity}")
+            logger.error(f"{e=}")
+            return None
+        self._timings.record_request(
+            activity.summary(), sent, self._timings.now(), 1, r.status_code
+        )
+        if _is_booked(r):
+            self._unwatch(activity)
+        elif _is_full(r):
+            # Someone else got the spot first, try again if it still shows
+            # as free in the next poll
+            self._snapshots[activity.date].forget(activity.id)
+        else:
+            # Booked already or some other error, waiting will not help
+            self._unwatch(activity)
+        return r, activity
+
+    def _unwatch(self, booked: Feelgood_Activity) -> None:
+        group = (booked.date, booked.group)
+        for activity in list(self._watched):
+            same_group = (
+                booked.group is not None
+                and (activity.date, activity.group) == group
+            )
+            if activity == booked or same_group:
+                del self._watched[activity]
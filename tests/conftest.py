@@ -2,6 +2,8 @@ import pytest
 from loguru import logger
 
 from book_feelgood.book import Feelgood_Activity
+from book_feelgood.metrics import Timings
+from book_feelgood.standin import Feelgood_Standin
 
 
 @pytest.fixture
@@ -11,6 +13,31 @@ def caplog(caplog):
     logger.remove(handler_id)
 
 
+@pytest.fixture(autouse=True)
+def no_timings_file(monkeypatch):
+    """
+    Keep the tests from appending timing reports to the repo's logs/.
+    """
+    monkeypatch.setattr(Timings, "write", lambda self, path: None)
+
+
+@pytest.fixture(autouse=True)
+def compiled_activities_dir(monkeypatch, tmp_path):
+    """
+    Keep compiled config and activities files of the tests out of the
+    repo's cache/.
+    """
+    monkeypatch.setattr(
+        "book_feelgood.parse.COMPILED_DIR", str(tmp_path / "compiled")
+    )
+
+
+@pytest.fixture
+def feelgood_standin():
+    with Feelgood_Standin() as standin:
+        yield standin
+
+
 @pytest.fixture
 def fa_fixture():
     fa = Feelgood_Activity(url="haha.se", name="Badminton", start="16:00")
@@ -1,16 +1,77 @@
+import email.utils
+import json
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
+import requests
 from requests.models import Response
 
+import book_feelgood.book
 from book_feelgood.book import (
     Feelgood_Activity,
+    _booking_chains,
+    _calibrate_clock,
+    _cancel_surplus,
+    _delayed_logout,
+    _full_activities,
     _get_simple_epoch,
+    _iter_remote_activities,
+    _list_params,
+    _login,
+    _match_by_date,
     _match_yml_activity_to_remote,
+    _mount_pool,
     _parse_booking,
+    _post_bookings,
+    _prepare_bookings,
+    _refreshed_matches,
     _return_matching_activities,
+    _sleep_until,
+    _split_by_date,
+    _stream_activities,
     _wait_for_time,
+    _warm_connections,
 )
+from book_feelgood.metrics import Timings
+
+
+class DummySession(requests.Session):
+    """
+    Stand-in for requests.session that answers every request with ok and
+    remembers how many requests were in flight at the same time.
+    """
+
+    def __init__(self, fail_url: str = None) -> None:
+        super().__init__()
+        self.fail_url = fail_url
+        self.urls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._all_sent = threading.Event()
+        self.expected = 0
+
+    def send(self, request, **kwargs):
+        url = request.url.split("?")[0]
+        with self._lock:
+            self.urls.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if len(self.urls) == self.expected:
+                self._all_sent.set()
+        self._all_sent.wait(timeout=2)
+        with self._lock:
+            self.in_flight -= 1
+        if url == self.fail_url:
+            raise requests.ConnectionError("boom")
+        r = Response()
+        r.status_code = 200
+        r._content = b'{"result": "ok"}'
+        return r
 
 
 def test_feelgood_activity_init(fa_fixture):
@@ -20,6 +81,31 @@ def test_feelgood_activity_init(fa_fixture):
     assert fa_fixture.start_time == 123123123123123123
 
 
+def test_feelgood_activity_from_remote():
+    urls = {"base_url": "https://dummy.com/", "participate": "p/"}
+    fa = Feelgood_Activity.from_remote(
+        _remote("7", "Badminton", "2024-03-09 15:00:00"), urls, "15:00"
+    )
+    assert fa == Feelgood_Activity(
+        "https://dummy.com/p/7", "Badminton", "2024-03-09 15:00:00", "15:00"
+    )
+    assert not hasattr(fa, "__dict__")
+
+
+def test_feelgood_activity_eq_hash():
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    same = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    other = Feelgood_Activity("https://dummy.com/1", "Badminton", "15:00")
+    assert fa == same
+    assert fa != other
+    assert fa != str(fa)
+    assert len({fa, same, other}) == 2
+    assert {fa: 1}[same] == 1
+
+    same.start_time = "14:59"
+    assert fa != same
+
+
 @pytest.fixture
 def future_date_fixture_1():
     return datetime(year=2024, month=3, day=10).date()
@@ -164,6 +250,14 @@ def test_parse_response_activity_errors(
     )
 
 
+def test_parse_response_error_with_status_ok(caplog, fa_fixture):
+    r = Response()
+    r.status_code = 200
+    r._content = b'{"error_code": "ACTIVITY_FULL"}'
+    _parse_booking((r, fa_fixture))
+    assert "Activity is fully booked already:" in caplog.text
+
+
 def test_parse_response_unhandled_error(caplog, fa_fixture):
     r = Response()
     r._content = b'{"error_code": "OH_SHIT"}'
@@ -270,6 +364,90 @@ def test_activities_to_book():
     assert result[0] == expected_fa_1
 
 
+class ClockSession:
+    """
+    Stand-in for requests.session whose server clock runs offset seconds
+    ahead of ours and which reports it in whole seconds in the Date header.
+    """
+
+    def __init__(self, offset: float, latency: float) -> None:
+        self.offset = offset
+        self.latency = latency
+
+    def head(self, url, **kwargs):
+        time.sleep(self.latency)
+        r = Response()
+        r.status_code = 200
+        r.headers["Date"] = email.utils.formatdate(
+            time.time() + self.offset, usegmt=True
+        )
+        time.sleep(self.latency)
+        return r
+
+
+def test_calibrate_clock():
+    offset, latency = _calibrate_clock(ClockSession(3.4, 0.005), "url")
+    assert offset == pytest.approx(3.4, abs=0.15)
+    assert latency == pytest.approx(0.005, abs=0.005)
+
+
+def test_calibrate_clock_no_date(caplog):
+    s = DummySession()
+    s.head = lambda url, **kwargs: Response()
+    assert _calibrate_clock(s, "url", samples=2) == (0.0, 0.0)
+    assert "Could not calibrate" in caplog.text
+
+
+@pytest.fixture
+def no_wait(monkeypatch):
+    monkeypatch.setattr(book_feelgood.book, "_wait_for_time", lambda *a: 0.0)
+
+
+def test_post_bookings_concurrent(no_wait):
+    activities = [
+        Feelgood_Activity(f"https://dummy.com/{i}", "Badminton", "15:00")
+        for i in range(3)
+    ]
+    s = DummySession()
+    s.expected = len(activities)
+    bookings = _post_bookings(False, {}, s, activities)
+    assert s.max_in_flight == len(activities)
+    assert sorted(fa.url for _, fa in bookings) == sorted(s.urls)
+    assert all(r.json()["result"] == "ok" for r, _ in bookings)
+
+
+def test_post_bookings_failed_request(caplog, no_wait):
+    activities = [
+        Feelgood_Activity(f"https://dummy.com/{i}", "Badminton", "15:00")
+        for i in range(2)
+    ]
+    s = DummySession(fail_url="https://dummy.com/1")
+    s.expected = len(activities)
+    bookings = _post_bookings(False, {}, s, activities)
+    assert [fa.url for _, fa in bookings] == ["https://dummy.com/0"]
+    assert "Booking request failed" in caplog.text
+
+
+def test_post_bookings_no_release_time(monkeypatch):
+    def _wait_for_time(*args):
+        raise AssertionError("should not wait")
+
+    monkeypatch.setattr(book_feelgood.book, "_wait_for_time", _wait_for_time)
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    s = DummySession()
+    s.expected = 1
+    bookings = _post_bookings(False, {}, s, [fa], release_time=None)
+    assert [fa.url for _, fa in bookings] == ["https://dummy.com/0"]
+
+
+def test_post_bookings_test_mode(caplog):
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    s = DummySession()
+    assert _post_bookings(True, {}, s, [fa]) == []
+    assert s.urls == []
+    assert "Payload:" in caplog.text
+
+
 def test_get_simple_epoch():
     now = datetime.today().replace(second=0, microsecond=0)
     epoch = _get_simple_epoch(
@@ -282,8 +460,10 @@ def test_wait_for_time_positive():
     now = datetime.now()
     now = now.replace(microsecond=0)
     future = now + timedelta(seconds=2)
-    _wait_for_time(future.hour, future.minute, future.second)
+    jitter = _wait_for_time(future.hour, future.minute, future.second)
     assert datetime.now().replace(microsecond=0) == future
+    # Loose bound, a busy test machine can preempt the spinning thread
+    assert 0.0 <= jitter < 0.05
 
 
 def test_wait_for_time_negative(caplog):
@@ -292,3 +472,444 @@ def test_wait_for_time_negative(caplog):
     past = now + timedelta(seconds=-1)
     _wait_for_time(past.hour, past.minute, past.second)
     assert "Time difference negative. Booking immediately!" in caplog.text
+
+
+def test_sleep_until_jitter(monkeypatch):
+    sleep = time.sleep
+    woken = []
+
+    def _sleep(seconds):
+        sleep(seconds)
+        woken.append(time.perf_counter())
+
+    monkeypatch.setattr(time, "sleep", _sleep)
+    deadline = time.perf_counter() + 0.1
+    jitter = _sleep_until(deadline, spin_seconds=0.02)
+    assert time.perf_counter() >= deadline
+    # Slept coarsely first, then spun through the rest
+    assert woken
+    assert woken[-1] < deadline
+    assert 0.0 <= jitter < 0.05
+
+
+def test_sleep_until_past_deadline():
+    deadline = time.perf_counter() - 1
+    assert _sleep_until(deadline) >= 1
+
+
+def test_wait_for_time_lead():
+    now = datetime.now()
+    now = now.replace(microsecond=0)
+    future = now + timedelta(seconds=3)
+    _wait_for_time(future.hour, future.minute, future.second, lead=1.0)
+    assert datetime.now().replace(microsecond=0) == future - timedelta(
+        seconds=1
+    )
+
+
+class PortRecorder(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ports = set()
+
+    def do_HEAD(self):
+        self.ports.add(self.client_address[1])
+        time.sleep(0.05)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_warm_connections():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PortRecorder)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        with requests.session() as s:
+            _mount_pool(s, base_url, 15)
+            assert s.get_adapter(base_url)._pool_maxsize == 15
+            _warm_connections(s, base_url, 3)
+            assert len(PortRecorder.ports) == 3
+            _warm_connections(s, base_url, 3)
+            assert len(PortRecorder.ports) == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class LogoutSession:
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+        self.urls = []
+        self.closed = False
+
+    def post(self, url, **kwargs):
+        self.urls.append(url)
+        r = Response()
+        r.status_code = self.status_code
+        return r
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize(
+    "status_code, log_response",
+    [(200, "Logged out: Tedde"), (500, "Logout fail, exiting...")],
+)
+def test_delayed_logout(caplog, status_code, log_response):
+    urls = {"base_url": "https://dummy.com/", "logout": "users/logout"}
+    s = LogoutSession(status_code)
+    start = time.perf_counter()
+    assert _delayed_logout(s, urls, "Tedde", 0.2) == (status_code == 200)
+    assert time.perf_counter() - start >= 0.2
+    assert s.urls == ["https://dummy.com/users/logout"]
+    assert s.closed
+    assert log_response in caplog.text
+
+
+def _remote(activity_id: str, name: str, start: str) -> dict:
+    return {
+        "ActivityType": {"name": name},
+        "Activity": {"id": activity_id, "start": start},
+    }
+
+
+def test_match_yml_activity_to_remote_index():
+    urls = {"base_url": "https://dummy.com/", "participate": "p/"}
+    feelgood_activities = {
+        "activities": [
+            _remote("1", "Badminton", "2024-03-09 09:15:00"),
+            _remote("2", "Spinning", "2024-03-09 15:00:00"),
+            _remote("3", "Badminton bana 2", "2024-03-09 15:00:00"),
+            _remote("4", "Badminton", "2024-03-09 16:00:00"),
+            _remote("5", "Badminton", "2024-03-10 15:00:00"),
+        ]
+    }
+    yml_acts = [
+        {"name": "Badminton", "time": "16:00"},
+        {"name": "Badminton", "time": "15:00"},
+        {"name": "Spinning", "time": "2024-03-09 15"},
+    ]
+    result = _match_yml_activity_to_remote(urls, yml_acts, feelgood_activities)
+    assert [fa.url for fa in result] == [
+        "https://dummy.com/p/2",
+        "https://dummy.com/p/3",
+        "https://dummy.com/p/4",
+        "https://dummy.com/p/5",
+    ]
+
+
+def test_refreshed_matches():
+    urls = {"base_url": "https://dummy.com/", "participate": "p/"}
+    saturday = datetime(2024, 3, 9).date()
+    yml_by_date = {saturday: [{"name": "Badminton", "time": "15:00"}]}
+    refresh = Future()
+    refresh.set_result(
+        {
+            saturday: {
+                "activities": [
+                    _remote("1", "Badminton", "2024-03-09 15:00:00")
+                ]
+            }
+        }
+    )
+    result = _refreshed_matches(refresh, urls, yml_by_date, [])
+    assert [fa.url for fa in result] == ["https://dummy.com/p/1"]
+
+
+def test_refreshed_matches_failed(caplog, fa_fixture):
+    refresh = Future()
+    refresh.set_exception(requests.ConnectionError("boom"))
+    assert _refreshed_matches(refresh, {}, [], [fa_fixture]) == [fa_fixture]
+    assert "Could not refresh the activity list" in caplog.text
+
+
+def test_feelgood_activity_date():
+    fa = Feelgood_Activity("haha.se", "Boka", "2024-03-09 09:00:00")
+    assert fa.date == datetime(2024, 3, 9).date()
+
+
+def test_split_and_match_by_date():
+    urls = {"base_url": "https://dummy.com/", "participate": "p/"}
+    saturday = datetime(2024, 3, 9).date()
+    sunday = datetime(2024, 3, 10).date()
+    feelgood_activities = {
+        "activities": [
+            _remote("1", "Badminton", "2024-03-08 15:00:00"),
+            _remote("2", "Badminton", "2024-03-09 15:00:00"),
+            _remote("3", "Spinning", "2024-03-09 15:00:00"),
+            _remote("4", "Spinning", "2024-03-10 15:00:00"),
+        ]
+    }
+    lists = _split_by_date(feelgood_activities, [saturday, sunday])
+    assert [len(lists[d]["activities"]) for d in (saturday, sunday)] == [2, 1]
+
+    yml_by_date = {
+        saturday: [{"name": "Badminton", "time": "15:00"}],
+        sunday: [{"name": "Spinning", "time": "15:00"}],
+    }
+    result = _match_by_date(urls, yml_by_date, lists)
+    assert [fa.url for fa in result] == [
+        "https://dummy.com/p/2",
+        "https://dummy.com/p/4",
+    ]
+
+
+class ScriptedSession(requests.Session):
+    """
+    Stand-in for requests.session answering requests from a list of
+    bodies, the last body is repeated once the list runs out.
+    """
+
+    def __init__(self, bodies: list[bytes]) -> None:
+        super().__init__()
+        self.bodies = bodies
+        self.posts = 0
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        body = self.bodies[min(self.posts, len(self.bodies) - 1)]
+        self.posts += 1
+        r = Response()
+        r.status_code = 200
+        r._content = body
+        return r
+
+
+TOO_EARLY = b'{"error_code": "ACTIVITY_BOOKING_TO_EARLY"}'
+
+
+@pytest.mark.parametrize(
+    "bodies, posts, result",
+    [
+        ([TOO_EARLY, TOO_EARLY, b'{"result": "ok"}'], 3, "ok"),
+        ([TOO_EARLY, b'{"error_code": "ACTIVITY_FULL"}'], 2, None),
+        ([b'{"error_code": "USER_ALREADY_BOOKED"}'], 1, None),
+    ],
+)
+def test_post_bookings_retry(caplog, no_wait, bodies, posts, result):
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    s = ScriptedSession(bodies)
+    [(r, _)] = _post_bookings(
+        False, {}, s, [fa], retry_interval=(0.001, 0.002)
+    )
+    assert s.posts == posts
+    assert r.json().get("result") == result
+    assert f"Attempts: {posts}, " in caplog.text
+
+
+def test_post_bookings_retry_window(no_wait):
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    s = ScriptedSession([TOO_EARLY])
+    start = time.perf_counter()
+    [(r, _)] = _post_bookings(
+        False, {}, s, [fa], retry_interval=(0.01, 0.01), retry_window=0.1
+    )
+    assert time.perf_counter() - start < 0.2
+    assert 5 <= s.posts <= 12
+    assert r.json()["error_code"] == "ACTIVITY_BOOKING_TO_EARLY"
+
+
+def test_prepare_bookings():
+    s = requests.session()
+    s.cookies.set("session_id", "secret")
+    activities = [
+        Feelgood_Activity("https://dummy.com/p/1", "Badminton", "15:00"),
+        Feelgood_Activity(
+            "https://dummy.com/p/2", "Boka", "2024-03-09 09:00:00", "09:30"
+        ),
+    ]
+    prepared = _prepare_bookings(s, {"accept": "application/json"}, activities)
+    assert [fa for _, fa in prepared] == activities
+    request, _ = prepared[1]
+    assert request.method == "POST"
+    assert request.url == "https://dummy.com/p/2?force=1"
+    assert request.headers["accept"] == "application/json"
+    assert request.headers["Cookie"] == "session_id=secret"
+    body = json.loads(request.body)
+    assert body["ActivityBooking"]["book_start"] == str(
+        _get_simple_epoch(datetime(2024, 3, 9).date(), "09:30")
+    )
+    assert (
+        "book_start" not in json.loads(prepared[0][0].body)["ActivityBooking"]
+    )
+
+
+def test_post_bookings_resends_prepared(no_wait):
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    s = ScriptedSession([TOO_EARLY, b'{"result": "ok"}'])
+    _post_bookings(False, {}, s, [fa], retry_interval=(0.001, 0.002))
+    assert len(s.sent) == 2
+    assert s.sent[0] is s.sent[1]
+
+
+def test_post_bookings_timings(no_wait):
+    fa = Feelgood_Activity("https://dummy.com/0", "Badminton", "15:00")
+    s = ScriptedSession([TOO_EARLY, b'{"result": "ok"}'])
+    timings = Timings()
+    _post_bookings(
+        False,
+        {},
+        s,
+        [fa],
+        retry_interval=(0.001, 0.002),
+        timings=timings,
+    )
+    report = timings.report()
+    [request] = report["requests"]
+    assert request["attempts"] == 2
+    assert request["received"] >= request["sent"]
+    assert "offset" in request
+    assert "wait" in report["phases"]
+
+
+def _list_body(*f_acts: dict) -> bytes:
+    return json.dumps(
+        {"count": len(f_acts), "activities": list(f_acts), "page": 1},
+        ensure_ascii=False,
+    ).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100_000])
+def test_iter_remote_activities(chunk_size):
+    f_acts = [
+        _remote("1", "Cirkelträning [ny]", "2024-03-09 09:15:00"),
+        _remote("2", 'Spinning "}]"', "2024-03-09 15:00:00"),
+        _remote("3", "Badminton", "2024-03-10 15:00:00"),
+    ]
+    body = _list_body(*f_acts)
+    starts = range(0, len(body), chunk_size)
+    chunks = [body[start:][:chunk_size] for start in starts]
+    assert list(_iter_remote_activities(chunks)) == f_acts
+
+
+def test_iter_remote_activities_empty_and_truncated():
+    assert list(_iter_remote_activities([_list_body()])) == []
+    body = _list_body(_remote("1", "Badminton", "2024-03-09 09:15:00"))
+    with pytest.raises(ValueError):
+        list(_iter_remote_activities([body[:-20]]))
+
+
+def test_stream_activities(feelgood_standin):
+    urls = feelgood_standin.urls
+    for i, (name, start) in enumerate(
+        [
+            ("Badminton", "2024-03-09 15:00:00"),
+            ("Spinning", "2024-03-09 15:00:00"),
+            ("Badminton", "2024-03-09 16:00:00"),
+            ("Badminton bana 2", "2024-03-10 15:00:00"),
+            ("Badminton", "2024-03-11 15:00:00"),
+        ]
+    ):
+        feelgood_standin.add_activity(str(i), name, start)
+    yml_by_date = {
+        datetime(2024, 3, 9).date(): [{"name": "Badminton", "time": "15:00"}],
+        datetime(2024, 3, 10).date(): [{"name": "Badminton", "time": "15:"}],
+    }
+    params = _list_params(
+        "f", datetime(2024, 3, 9).date(), datetime(2024, 3, 10).date()
+    )
+    with requests.session() as s:
+        _login(s, urls, "tedde@feelgood.se", "pw")
+        lists = _stream_activities(
+            s, f"{urls['base_url']}{urls['list']}", params, {}, yml_by_date
+        )
+    assert {
+        day: [f_act["Activity"]["id"] for f_act in lst["activities"]]
+        for day, lst in lists.items()
+    } == {
+        datetime(2024, 3, 9).date(): ["0"],
+        datetime(2024, 3, 10).date(): ["3"],
+    }
+
+
+def _chain_requests(chains: list) -> list[list]:
+    return [[request for request, _ in chain] for chain in chains]
+
+
+def test_booking_chains():
+    start = "2024-03-09 15:00:00"
+    prepared = [
+        ("r1", Feelgood_Activity("u/1", "B", start, group=1, rank=1)),
+        ("r2", Feelgood_Activity("u/2", "B", start)),
+        ("r3", Feelgood_Activity("u/3", "B", start, group=1, rank=0)),
+        ("r4", Feelgood_Activity("u/4", "B", "2024-03-10 15:00:00", group=1)),
+    ]
+    assert _chain_requests(_booking_chains(prepared)) == [
+        ["r1"],
+        ["r2"],
+        ["r3"],
+        ["r4"],
+    ]
+    assert _chain_requests(_booking_chains(prepared, "on_full")) == [
+        ["r3", "r1"],
+        ["r2"],
+        ["r4"],
+    ]
+    with pytest.raises(ValueError):
+        _booking_chains(prepared, "eager")
+
+
+def test_booking_chains_same_activity():
+    start = "2024-03-09 14:00:00"
+    prepared = [
+        ("r1", Feelgood_Activity("u/42", "Boka", start, "14:30", 1, 1)),
+        ("r2", Feelgood_Activity("u/42", "Boka", start, "14:00", 1, 0)),
+        ("r3", Feelgood_Activity("u/43", "Boka", start, "15:00", 1, 2)),
+    ]
+    # Slots of one remote activity can not be cancelled apart
+    assert _chain_requests(_booking_chains(prepared)) == [
+        ["r2", "r1"],
+        ["r3"],
+    ]
+
+
+def test_cancel_surplus_same_activity():
+    def response(body: bytes) -> Response:
+        r = Response()
+        r.status_code = 200
+        r._content = body
+        return r
+
+    already = response(b'{"error_code": "USER_ALREADY_BOOKED"}')
+    ok = response(b'{"result": "ok"}')
+    start = "2024-03-09 14:00:00"
+    kept = Feelgood_Activity("u/42", "Boka", start, "14:00", 1, 0)
+    same = Feelgood_Activity("u/42", "Boka", start, "14:30", 1, 1)
+    other = Feelgood_Activity("u/43", "Boka", start, "15:00", 1, 2)
+    s = DummySession()
+    s.expected = 1
+    urls = {"base_url": "https://dummy.com/", "cancel": "cancel/"}
+    cancelled = _cancel_surplus(
+        s, urls, {}, [(already, kept), (ok, same), (ok, other)]
+    )
+    # Cancelling 42 would cancel the kept booking as well
+    assert cancelled == [other]
+    assert s.urls == ["https://dummy.com/cancel/43/1"]
+
+
+def test_full_activities():
+    def response(body: bytes) -> Response:
+        r = Response()
+        r.status_code = 200
+        r._content = body
+        return r
+
+    full = response(b'{"error_code": "ACTIVITY_FULL"}')
+    ok = response(b'{"result": "ok"}')
+    start = "2024-03-09 15:00:00"
+    grouped = Feelgood_Activity("u/1", "B", start, group=1)
+    alternative = Feelgood_Activity("u/2", "B", start, group=1, rank=1)
+    single = Feelgood_Activity("u/3", "B", start)
+    assert _full_activities(
+        [(full, grouped), (ok, alternative), (full, single)]
+    ) == [single]
+    assert _full_activities([(full, grouped), (full, alternative)]) == [
+        grouped,
+        alternative,
+    ]
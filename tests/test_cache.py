@@ -0,0 +1,79 @@
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from book_feelgood.cache import Activity_Cache
+
+FACILITY = "60a7ac3f-b774-4228-a9a3-056c0a10010d"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return Activity_Cache(directory=tmp_path / "cache", ttl=60)
+
+
+@pytest.fixture
+def date():
+    return datetime.date(2024, 3, 10)
+
+
+def test_cache_miss(cache, date):
+    assert cache.get(FACILITY, date) == (None, False)
+
+
+def test_cache_put_get(cache, date):
+    activities = {"activities": [{"Activity": {"id": "cool_id"}}]}
+    cache.put(FACILITY, date, activities)
+    assert cache.get(FACILITY, date) == (activities, True)
+    assert cache.get("other_facility", date) == (None, False)
+
+
+def test_cache_stale(cache, date):
+    activities = {"activities": []}
+    cache.put(FACILITY, date, activities)
+    path = next(cache.directory.glob("*.json"))
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert cache.get(FACILITY, date) == (activities, False)
+
+
+def test_cache_evict(cache, date):
+    cache.put(FACILITY, date - datetime.timedelta(days=1), {})
+    cache.put(FACILITY, date, {})
+    cache.put(FACILITY, date + datetime.timedelta(days=1), {})
+    cache.evict(date)
+    assert sorted(p.name[:10] for p in cache.directory.glob("*.json")) == [
+        "2024-03-10",
+        "2024-03-11",
+    ]
+
+
+def test_cache_evict_no_directory(cache, date):
+    cache.evict(date)
+    assert not cache.directory.exists()
+
+
+def test_cache_put_concurrent(cache, date):
+    activities = {"activities": [{"Activity": {"id": "cool_id"}}]}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(cache.put, FACILITY, date, activities)
+            for _ in range(32)
+        ]
+    for future in futures:
+        future.result()
+    assert cache.get(FACILITY, date) == (activities, True)
+    assert list(cache.directory.glob("*.tmp")) == []
+
+
+def test_cache_put_fails(cache, date, caplog, monkeypatch):
+    def _replace(src, dst):
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(os, "replace", _replace)
+    cache.put(FACILITY, date, {"activities": []})
+    assert "Could not cache" in caplog.text
+    assert list(cache.directory.iterdir()) == []
@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+
+import requests
+from requests.models import Response
+
+from book_feelgood.book import Feelgood_Activity
+from book_feelgood.client import Feelgood_Client
+
+URLS = {
+    "base_url": "https://dummy.com/",
+    "logout": "users/logout",
+    "participate": "w_booking/activities/participate/",
+    "cancel": "w_booking/activities/cancel/",
+    "list": "w_booking/activities/list",
+}
+
+LIST = (
+    b'{"activities": ['
+    b'{"Activity": {"id": "id_1", "start": "2024-03-10 15:00:00"}},'
+    b'{"Activity": {"id": "id_2", "start": "2024-03-11 15:00:00"}}]}'
+)
+
+
+class RecordingSession(requests.Session):
+    def __init__(self, answers: list[bytes] = ()) -> None:
+        super().__init__()
+        self.answers = list(answers)
+        self.requests = []
+        self.closed = False
+
+    def send(self, request, **kwargs):
+        url, _, query = request.url.partition("?")
+        self.requests.append((request.method, url, query))
+        r = Response()
+        r.status_code = 200
+        if "participate" in url and self.answers:
+            r._content = self.answers.pop(0)
+        else:
+            r._content = LIST
+        return r
+
+    def close(self):
+        self.closed = True
+
+
+def test_client_calls():
+    s = RecordingSession()
+    date = datetime.date(2024, 3, 10)
+
+    async def _calls():
+        async with Feelgood_Client(URLS, {}, session=s) as client:
+            assert await client.login("Tedde", "pw")
+            lists = await client.list_activities("fac", [date])
+            assert [
+                f["Activity"]["id"] for f in lists[date]["activities"]
+            ] == ["id_1"]
+            await client.cancel("id_2")
+            assert await client.logout("Tedde")
+
+    asyncio.run(_calls())
+    methods_urls = [(method, url) for method, url, _ in s.requests]
+    assert methods_urls == [
+        ("POST", "https://dummy.com/"),
+        ("GET", "https://dummy.com/w_booking/activities/list"),
+        ("POST", "https://dummy.com/w_booking/activities/cancel/id_2/1"),
+        ("POST", "https://dummy.com/users/logout"),
+    ]
+    assert "facility=fac" in s.requests[1][2]
+    assert s.requests[2][2] == "force=1"
+    assert s.closed
+
+
+def test_client_participate():
+    s = RecordingSession(
+        [
+            b'{"error_code": "ACTIVITY_BOOKING_TO_EARLY"}',
+            b'{"result": "ok"}',
+            b'{"result": "ok"}',
+        ]
+    )
+    activities = [
+        Feelgood_Activity(
+            f"{URLS['base_url']}{URLS['participate']}{activity_id}",
+            "Badminton",
+            "2024-03-10 15:00:00",
+        )
+        for activity_id in ("id_1", "id_2")
+    ]
+
+    async def _book():
+        async with Feelgood_Client(URLS, {}, session=s) as client:
+            prepared = client.prepare(activities)
+            return await asyncio.gather(
+                *(
+                    client.participate(request, (0.001, 0.002), 1.0)
+                    for request, _ in prepared
+                )
+            )
+
+    results = asyncio.run(_book())
+    assert sorted(attempts for _, attempts in results) == [1, 2]
+    assert all(r.json() == {"result": "ok"} for r, _ in results)
+    # The booking that was too early was sent again
+    assert len(s.requests) == 3
+    assert all("participate" in url for _, url, _ in s.requests)
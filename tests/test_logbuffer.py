@@ -0,0 +1,33 @@
+from book_feelgood.logbuffer import Log_Buffer
+
+
+def test_log_buffer_flush(caplog):
+    calls = []
+
+    def summary():
+        calls.append(1)
+        return "Badminton"
+
+    buffer = Log_Buffer()
+    buffer.info("Attempts: {}, {}", 2, summary)
+    buffer.error("Booking request failed")
+    assert len(buffer) == 2
+    assert caplog.text == ""
+    assert calls == []
+
+    buffer.flush()
+    assert calls == [1]
+    assert len(buffer) == 0
+    lines = caplog.text.splitlines()
+    assert "INFO" in lines[0] and "Attempts: 2, Badminton" in lines[0]
+    assert "ERROR" in lines[1] and "Booking request failed" in lines[1]
+
+
+def test_log_buffer_context(caplog):
+    try:
+        with Log_Buffer() as buffer:
+            buffer.success("Done sleeping, jitter: {:.3f} ms", 0.1234)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert "Done sleeping, jitter: 0.123 ms" in caplog.text
@@ -0,0 +1,42 @@
+import json
+import time
+
+from book_feelgood.metrics import Timings
+
+
+def test_timings_phase():
+    timings = Timings()
+    with timings.phase("wait"):
+        time.sleep(0.01)
+    phase = timings.report()["phases"]["wait"]
+    assert phase["start"] >= 0
+    assert phase["duration"] >= 0.01
+
+
+def test_timings_record_request():
+    timings = Timings()
+    timings.set("target", timings.wall(0.5))
+    timings.record_request("Badminton", 0.502, 0.552, 2, 200)
+    [request] = timings.report()["requests"]
+    assert request["attempts"] == 2
+    assert request["status_code"] == 200
+    assert abs(request["duration"] - 0.05) < 1e-9
+    assert abs(request["offset"] - 0.002) < 1e-6
+
+
+def test_timings_no_target():
+    timings = Timings()
+    timings.record_request("Badminton", 0.1, 0.2, 1, 200)
+    assert "offset" not in timings.report()["requests"][0]
+
+
+def test_timings_write(tmp_path, monkeypatch):
+    monkeypatch.undo()
+    path = tmp_path / "t.timings.jsonl"
+    timings = Timings()
+    timings.set("jitter", 0.0001)
+    timings.write(path)
+    timings.write(path)
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["jitter"] == 0.0001
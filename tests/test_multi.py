@@ -0,0 +1,96 @@
+import asyncio
+
+from loguru import logger
+
+import book_feelgood.multi
+from book_feelgood.multi import _account_filter, _run_account
+
+
+def test_account_filter():
+    records = []
+    handler_id = logger.add(records.append, filter=_account_filter("t"))
+    try:
+        with logger.contextualize(account="t"):
+            logger.info("for t")
+        with logger.contextualize(account="a"):
+            logger.info("for a")
+        logger.info("for nobody")
+    finally:
+        logger.remove(handler_id)
+    assert [r.record["message"] for r in records] == ["for t"]
+
+
+class DummyClient:
+    def __init__(self, urls, headers, logged_in=True) -> None:
+        self.session = "session"
+        self.logged_in = logged_in
+        self.calls = []
+        DummyClient.last = self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.calls.append("close")
+
+    async def login(self, username, password, store=None):
+        self.calls.append("login")
+        return self.logged_in
+
+    async def logout(self, username):
+        self.calls.append("logout")
+        return True
+
+
+SETTINGS = {
+    "day_offset": "0..6",
+    "logout_delay": [0, 0],
+    "session_cache": False,
+}
+
+
+def test_run_account(monkeypatch):
+    calls = []
+
+    async def _book_client_session(client, yml_by_date, *args):
+        logger.info("booking")
+        calls.append((client.session, yml_by_date))
+
+    records = []
+    handler_id = logger.add(records.append, filter=_account_filter("t-tst"))
+    monkeypatch.setattr(book_feelgood.multi, "Feelgood_Client", DummyClient)
+    monkeypatch.setattr(
+        book_feelgood.multi, "_book_client_session", _book_client_session
+    )
+    try:
+        code = asyncio.run(
+            _run_account("Tedde", "pw", "t-tst", True, None, SETTINGS, {}, {})
+        )
+    finally:
+        logger.remove(handler_id)
+    assert code == 0
+    assert DummyClient.last.calls == ["login", "logout", "close"]
+    assert calls[0][0] == "session"
+    assert len(calls[0][1]) == 3
+    assert "booking" in [r.record["message"] for r in records]
+
+
+def test_run_account_login_fail(monkeypatch):
+    monkeypatch.setattr(
+        book_feelgood.multi,
+        "Feelgood_Client",
+        lambda urls, headers: DummyClient(urls, headers, logged_in=False),
+    )
+    code = asyncio.run(
+        _run_account("Tedde", "pw", "t-tst", True, None, SETTINGS, {}, {})
+    )
+    assert code == 8123
+    assert DummyClient.last.calls == ["login", "close"]
+
+
+def test_run_account_exception(caplog):
+    code = asyncio.run(
+        _run_account("Tedde", "pw", "t-tst", True, None, {}, {}, {})
+    )
+    assert code == 1
+    assert "Booking failed for t-tst" in caplog.text
@@ -1,15 +1,24 @@
 import datetime
+import json
+import os
 import shlex
+import subprocess
+import sys
 
 import pytest
 
 from book_feelgood.parse import (
+    compile_activities,
     get_date,
+    initialize_multi_parser,
     initialize_parser,
+    load_activities,
     load_config,
     log_dict,
     parse_day,
+    parse_day_offset,
     read_yaml,
+    read_yaml_compiled,
     splash,
 )
 
@@ -133,3 +142,217 @@ def test_initialize_parser_usr_pw():
         "day_offset": None,
         "start_time": None,
     }
+
+
+def test_initialize_multi_parser():
+    command = "-acc Tedde very_secret t --account Extra also_secret a -tst"
+    args = initialize_multi_parser(shlex.split(command))
+    assert args == {
+        "accounts": [
+            ["Tedde", "very_secret", "t"],
+            ["Extra", "also_secret", "a"],
+        ],
+        "test": True,
+        "day_offset": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "day_offset, expected",
+    [(6, [6]), ("6", [6]), ("1..3", [1, 2, 3]), ("4..4", [4])],
+)
+def test_parse_day_offset(day_offset, expected):
+    assert parse_day_offset(day_offset) == expected
+
+
+@pytest.mark.parametrize("day_offset", ["six", "3..1", "1..", "1..6..7"])
+def test_parse_day_offset_value_error(day_offset):
+    with pytest.raises(
+        ValueError, match="Could not parse input as a day offset"
+    ):
+        parse_day_offset(day_offset)
+
+
+def test_read_yaml_compiled(tmp_path, monkeypatch):
+    yml = tmp_path / "config.yml"
+    yml.write_text("settings:\n  day_offset: 6\n")
+    compiled_dir = tmp_path / "compiled"
+
+    blob = read_yaml_compiled(str(yml), str(compiled_dir))
+    assert blob == {"settings": {"day_offset": 6}}
+    assert len(list(compiled_dir.iterdir())) == 1
+
+    # Served from the snapshot without touching yaml
+    def no_yaml(filename):
+        raise AssertionError(f"parsed {filename}")
+
+    monkeypatch.setattr("book_feelgood.parse.read_yaml", no_yaml)
+    assert read_yaml_compiled(str(yml), str(compiled_dir)) == blob
+    monkeypatch.undo()
+
+    # A changed file is parsed again
+    yml.write_text("settings:\n  day_offset: 5\n")
+    stat = os.stat(yml)
+    os.utime(yml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    blob = read_yaml_compiled(str(yml), str(compiled_dir))
+    assert blob == {"settings": {"day_offset": 5}}
+
+
+@pytest.mark.parametrize("field", ["format", "compiler"])
+def test_read_yaml_compiled_version(tmp_path, monkeypatch, field):
+    yml = tmp_path / "config.yml"
+    yml.write_text("settings:\n  day_offset: 6\n")
+    compiled_dir = tmp_path / "compiled"
+    read_yaml_compiled(str(yml), str(compiled_dir))
+    [snapshot] = compiled_dir.iterdir()
+    compiled = json.loads(snapshot.read_text())
+    compiled[field] = "other"
+    compiled["blob"] = {"settings": {"day_offset": 0}}
+    snapshot.write_text(json.dumps(compiled))
+    monkeypatch.setattr("book_feelgood.parse._compiled", {})
+
+    # A snapshot of another version is compiled again
+    blob = read_yaml_compiled(str(yml), str(compiled_dir))
+    assert blob == {"settings": {"day_offset": 6}}
+    assert json.loads(snapshot.read_text())[field] != "other"
+
+
+def test_read_yaml_compiled_copies(tmp_path, monkeypatch):
+    yml = tmp_path / "config.yml"
+    yml.write_text("settings:\n  day_offset: 6\n")
+    compiled_dir = tmp_path / "compiled"
+    monkeypatch.setattr("book_feelgood.parse.COMPILED_DIR", str(compiled_dir))
+
+    read_yaml_compiled(str(yml))["settings"]["day_offset"] = 0
+    blob = read_yaml_compiled(str(yml))
+    assert blob == {"settings": {"day_offset": 6}}
+    # The snapshot follows COMPILED_DIR when it is changed
+    assert len(list(compiled_dir.iterdir())) == 1
+
+
+def test_read_yaml_compiled_not_json(tmp_path):
+    yml = tmp_path / "dates.yml"
+    yml.write_text("day: 2024-01-01\n")
+    compiled_dir = tmp_path / "compiled"
+
+    blob = read_yaml_compiled(str(yml), str(compiled_dir))
+    assert blob == {"day": datetime.date(2024, 1, 1)}
+    assert list(compiled_dir.iterdir()) == []
+
+
+def test_book_does_not_import_requests():
+    code = "import sys, book_feelgood.book; " "print('urllib3' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_compile_activities():
+    activities = {
+        "activities": [
+            {"name": "Badminton", "time": "15:00", "day": "Wednesday"},
+            {
+                "name": "Boka",
+                "time": "09:00",
+                "day": "saturday",
+                "start_time": "09:00",
+            },
+            {"name": "Yoga", "time": "T10", "day": "Sunday"},
+        ]
+    }
+    compiled = compile_activities(activities, "t.yml")
+    assert [act["weekday"] for act in compiled["activities"]] == [3, 6, 7]
+    assert compiled["activities"][1]["start_time"] == "09:00"
+    assert "start_time" not in compiled["activities"][0]
+
+
+@pytest.mark.parametrize(
+    "activity, error",
+    [
+        ({"time": "15:00", "day": "Monday"}, "Missing or not quoted name"),
+        ({"name": "B", "time": 900, "day": "Monday"}, "not quoted time"),
+        ({"name": "B", "time": "25:00", "day": "Monday"}, "Invalid time"),
+        ({"name": "B", "time": "15:00", "day": "Mon"}, "str: mon"),
+        (
+            {"name": "B", "time": "15:00", "day": "Monday", "start_time": 9},
+            "Start time not quoted",
+        ),
+        (
+            {"name": "B", "time": "15:00", "day": "Monday", "start_time": "9"},
+            "Invalid start time",
+        ),
+        ("Badminton", "Not an activity"),
+    ],
+)
+def test_compile_activities_value_error(activity, error):
+    with pytest.raises(ValueError, match=error):
+        compile_activities({"activities": [activity]}, "t.yml")
+
+
+def test_compile_activities_no_list():
+    with pytest.raises(ValueError, match="No list of activities in t.yml"):
+        compile_activities({"activites": []}, "t.yml")
+
+
+def test_load_activities(tmp_path, monkeypatch):
+    yml = tmp_path / "t.yml"
+    yml.write_text(
+        'activities:\n  - name: Badminton\n    time: "15:00"\n'
+        "    day: Friday\n"
+    )
+    activities = load_activities(str(yml))
+    assert activities["activities"][0]["weekday"] == 5
+    # Cached in memory, every call gets a copy of its own
+    with monkeypatch.context() as m:
+        m.setattr("book_feelgood.parse.json.load", None)
+        again = load_activities(str(yml))
+    assert again == activities and again is not activities
+
+    # And on disk, for the next run
+    monkeypatch.setattr("book_feelgood.parse._compiled", {})
+    monkeypatch.setattr("book_feelgood.parse.read_yaml", None)
+    assert load_activities(str(yml)) == activities
+
+
+def test_compile_activities_alternatives():
+    activities = {
+        "activities": [
+            {"name": "Yoga", "time": "10:00", "day": "Monday"},
+            {
+                "name": "Boka",
+                "time": "09:00",
+                "day": "Friday",
+                "start_time": "09:00",
+                "alternatives": [
+                    {"start_time": "09:30"},
+                    {"name": "Badminton", "time": "10:00", "day": "Sunday"},
+                ],
+            },
+        ]
+    }
+    compiled = compile_activities(activities, "t.yml")["activities"]
+    assert "group" not in compiled[0]
+    assert [(act["group"], act["rank"]) for act in compiled[1:]] == [
+        (1, 0),
+        (1, 1),
+        (1, 2),
+    ]
+    assert compiled[2]["name"] == "Boka"
+    assert compiled[2]["start_time"] == "09:30"
+    # The day of an alternative is always the day of its activity
+    assert compiled[3]["weekday"] == 5
+    assert compiled[3]["start_time"] == "09:00"
+
+
+def test_compile_activities_alternatives_value_error():
+    activity = {"name": "B", "time": "15:00", "day": "Monday"}
+    with pytest.raises(ValueError, match="Alternatives are not a list"):
+        compile_activities({"activities": [{**activity, "alternatives": 1}]})
+    with pytest.raises(ValueError, match="activity 1 alternative 1"):
+        compile_activities(
+            {"activities": [{**activity, "alternatives": [{"time": "25:00"}]}]}
+        )
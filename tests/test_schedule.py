@@ -0,0 +1,59 @@
+from book_feelgood.schedule import Schedule_Snapshot, free_spots
+
+
+def _record(activity_id, start="2024-03-09 15:00:00", capacity=2, booked=0):
+    return {
+        "ActivityType": {"name": "Badminton"},
+        "Activity": {
+            "id": activity_id,
+            "start": start,
+            "max_participants": capacity,
+            "participants": booked,
+        },
+    }
+
+
+def _list(*records):
+    return {"activities": list(records)}
+
+
+def test_schedule_snapshot_update():
+    snapshot = Schedule_Snapshot(_list(_record("1"), _record("2")))
+    assert len(snapshot) == 2
+    assert "1" in snapshot
+
+    moved = _record("2", start="2024-03-09 16:00:00")
+    diff = snapshot.update(_list(_record("1"), moved, _record("3")))
+    assert diff.added == [_record("3")]
+    assert diff.removed == []
+    assert diff.changed == [(_record("2"), moved)]
+
+    diff = snapshot.update(_list(_record("1", booked=1), moved))
+    assert diff.added == []
+    assert diff.removed == [_record("3")]
+    assert diff.changed == [(_record("1"), _record("1", booked=1))]
+    assert snapshot.get("1") == _record("1", booked=1)
+    assert snapshot.get("3") is None
+
+
+def test_schedule_snapshot_unchanged():
+    snapshot = Schedule_Snapshot(_list(_record("1")))
+    # Fields that are not compared do not count as a change
+    renamed = _record("1")
+    renamed["ActivityType"]["name"] = "Squash"
+    diff = snapshot.update(_list(renamed))
+    assert not diff
+    assert diff == ([], [], [])
+
+
+def test_schedule_snapshot_forget():
+    snapshot = Schedule_Snapshot(_list(_record("1")))
+    snapshot.forget("1")
+    snapshot.forget("unknown")
+    assert snapshot.update(_list(_record("1"))).added == [_record("1")]
+
+
+def test_free_spots():
+    assert free_spots(_record("1", capacity=3, booked=1)) == 2
+    assert free_spots(_record("1", capacity=1, booked=1)) == 0
+    assert free_spots({"Activity": {"id": "1"}}) == 0
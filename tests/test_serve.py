@@ -0,0 +1,134 @@
+import datetime
+import os
+
+import pytest
+import requests
+
+import book_feelgood.serve
+from book_feelgood.serve import Activities_Watcher, _next_run, _serve_account
+
+
+@pytest.mark.parametrize(
+    "now, expected",
+    [
+        (
+            datetime.datetime(2024, 3, 10, 7, 0),
+            datetime.datetime(2024, 3, 10, 7, 58, 1),
+        ),
+        (
+            datetime.datetime(2024, 3, 10, 7, 59),
+            datetime.datetime(2024, 3, 11, 7, 58, 1),
+        ),
+        (
+            datetime.datetime(2024, 3, 10, 23, 0),
+            datetime.datetime(2024, 3, 11, 7, 58, 1),
+        ),
+    ],
+)
+def test_next_run(now, expected):
+    assert _next_run(now, "08:00:01", 120) == expected
+
+
+def test_activities_watcher(tmp_path, caplog):
+    path = tmp_path / "t.yml"
+    act = '\n    time: "15:00"\n    day: Monday\n'
+    path.write_text(f"activities:\n  - name: Badminton{act}")
+    watcher = Activities_Watcher(directory=tmp_path)
+    assert watcher.get("t")["activities"][0]["name"] == "Badminton"
+
+    path.write_text(f"activities:\n  - name: Spinning{act}")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    watcher.refresh()
+    assert "Reloaded" in caplog.text
+    assert watcher.get("t")["activities"][0]["name"] == "Spinning"
+
+
+def test_activities_watcher_broken_file(tmp_path, caplog):
+    path = tmp_path / "t.yml"
+    path.write_text("activities: []\n")
+    watcher = Activities_Watcher(directory=tmp_path)
+    watcher.get("t")
+    path.unlink()
+    watcher.refresh()
+    assert "Could not reload t" in caplog.text
+    assert watcher.get("t") == {"activities": []}
+
+
+def test_activities_watcher_bad_edit(tmp_path, caplog):
+    path = tmp_path / "t.yml"
+    act = '\n    time: "15:00"\n    day: Monday\n'
+    path.write_text(f"activities:\n  - name: Badminton{act}")
+    watcher = Activities_Watcher(directory=tmp_path)
+    watcher.get("t")
+
+    path.write_text(
+        f"activities:\n  - name: Spinning{act}".replace("Mon", "Mn")
+    )
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    watcher.refresh()
+    watcher.refresh()
+    assert caplog.text.count("Could not reload t") == 1
+    assert watcher.get("t")["activities"][0]["name"] == "Badminton"
+
+
+def test_activities_watcher_missing_file(tmp_path):
+    watcher = Activities_Watcher(directory=tmp_path)
+    with pytest.raises(FileNotFoundError):
+        watcher.get("t")
+
+
+@pytest.mark.parametrize("logged_in, booked", [(True, 1), (False, 0)])
+def test_serve_account(monkeypatch, logged_in, booked):
+    calls = []
+    monkeypatch.setattr(
+        book_feelgood.serve, "_resume_or_login", lambda *args: logged_in
+    )
+    monkeypatch.setattr(
+        book_feelgood.serve,
+        "_book_session",
+        lambda s, yml_by_date, *args: calls.append(yml_by_date),
+    )
+    today = datetime.date.today()
+    activities = {
+        "activities": [
+            {"name": "Badminton", "time": "15:00", "day": today.strftime("%A")}
+        ]
+    }
+    settings = {"day_offset": 6}
+    with requests.session() as s:
+        _serve_account(
+            s, "u", "p", activities, "t", True, "0", settings, {}, {}
+        )
+    assert len(calls) == booked
+    if booked:
+        assert list(calls[0]) == [today]
+
+
+def test_serve_account_reuses_session(monkeypatch):
+    logins = []
+    monkeypatch.setattr(
+        book_feelgood.serve,
+        "_resume_or_login",
+        lambda *args: logins.append(args) or True,
+    )
+    monkeypatch.setattr(book_feelgood.serve, "_session_valid", lambda *a: True)
+    monkeypatch.setattr(book_feelgood.serve, "_book_session", lambda *a: None)
+    today = datetime.date.today()
+    activities = {
+        "activities": [
+            {"name": "Badminton", "time": "15:00", "day": today.strftime("%A")}
+        ]
+    }
+    settings = {"day_offset": 6}
+    with requests.session() as s:
+        _serve_account(
+            s, "u", "p", activities, "t", True, "0", settings, {}, {}
+        )
+        s.cookies.set("CAKEPHP", "logged-in")
+        _serve_account(
+            s, "u", "p", activities, "t", True, "0", settings, {}, {}
+        )
+    # Only the first run, without cookies, had to log in
+    assert len(logins) == 1
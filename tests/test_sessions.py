@@ -0,0 +1,67 @@
+import os
+
+import pytest
+import requests
+
+pytest.importorskip("cryptography")
+
+from book_feelgood.book import _resume_or_login  # noqa: E402
+from book_feelgood.sessions import Session_Store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fast_kdf(monkeypatch):
+    monkeypatch.setattr("book_feelgood.sessions.KDF_ITERATIONS", 1000)
+
+
+def _jar() -> requests.cookies.RequestsCookieJar:
+    jar = requests.cookies.RequestsCookieJar()
+    jar.set("session", "token", domain="127.0.0.1", path="/")
+    return jar
+
+
+def test_session_store_roundtrip(tmp_path):
+    store = Session_Store(tmp_path)
+    assert store.load("tedde@feelgood.se", "pw") is None
+
+    store.save("tedde@feelgood.se", "pw", _jar())
+    [path] = list(tmp_path.iterdir())
+    assert "tedde" not in path.name
+    assert b"token" not in path.read_bytes()
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+    jar = store.load("tedde@feelgood.se", "pw")
+    assert jar.get("session", domain="127.0.0.1") == "token"
+
+    store.clear("tedde@feelgood.se")
+    assert store.load("tedde@feelgood.se", "pw") is None
+
+
+def test_session_store_wrong_password(tmp_path, caplog):
+    store = Session_Store(tmp_path)
+    store.save("tedde@feelgood.se", "pw", _jar())
+    assert store.load("tedde@feelgood.se", "other") is None
+    assert "Could not read the stored session" in caplog.text
+
+
+def test_resume_or_login(tmp_path, feelgood_standin):
+    urls = feelgood_standin.urls
+    store = Session_Store(tmp_path)
+    with requests.session() as s:
+        assert _resume_or_login(s, urls, "tedde@feelgood.se", "pw", store)
+        store.save("tedde@feelgood.se", "pw", s.cookies)
+
+    def logins():
+        return [r for r in feelgood_standin.requests if r[1:] == ("POST", "")]
+
+    assert len(logins()) == 1
+    with requests.session() as s:
+        assert _resume_or_login(s, urls, "tedde@feelgood.se", "pw", store)
+    assert len(logins()) == 1
+
+    # The server forgot the session, log in again
+    feelgood_standin.sessions.clear()
+    with requests.session() as s:
+        assert _resume_or_login(s, urls, "tedde@feelgood.se", "pw", store)
+    assert len(logins()) == 2
+    assert store.load("tedde@feelgood.se", "pw") is None
@@ -0,0 +1,316 @@
+import asyncio
+import datetime
+import time
+
+import pytest
+import requests
+
+from book_feelgood.book import (
+    Feelgood_Activity,
+    _book_account,
+    _login,
+    _post_bookings,
+    _yml_by_date,
+)
+from book_feelgood.client import Feelgood_Client
+from book_feelgood.multi import _book_client_session
+from book_feelgood.parse import compile_activities, get_date, load_config
+
+
+def _settings(tmp_path) -> dict:
+    settings, _, _ = load_config()
+    settings["cache_dir"] = tmp_path / "cache"
+    settings["clock_samples"] = 2
+    settings["warmup_seconds"] = 0
+    settings["logout_delay"] = [0, 0]
+    settings["release_time"] = "00:00:00"
+    return settings
+
+
+def test_standin_login_required(feelgood_standin):
+    urls = feelgood_standin.urls
+    r = requests.get(f"{urls['base_url']}{urls['list']}")
+    assert r.status_code == 403
+    with requests.session() as s:
+        assert not _login(s, urls, "tedde@feelgood.se", "")
+        assert _login(s, urls, "tedde@feelgood.se", "pw")
+        r = s.get(f"{urls['base_url']}{urls['list']}")
+        assert r.status_code == 200
+
+
+@pytest.mark.parametrize("stream_list", [False, True])
+def test_standin_book_account(tmp_path, feelgood_standin, stream_list):
+    settings = _settings(tmp_path)
+    settings["stream_list"] = stream_list
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    tomorrow = get_date(day_offset=1)
+    feelgood_standin.add_activity(
+        "bad", "Badminton", f"{horizon} 15:00:00", capacity=2
+    )
+    feelgood_standin.add_activity(
+        "spin", "Spinning", f"{tomorrow} 18:00:00", capacity=1
+    )
+    feelgood_standin.add_activity(
+        "other", "Badminton", f"{horizon} 16:00:00", capacity=2
+    )
+    activities = {
+        "activities": [
+            {
+                "name": "Badminton",
+                "time": "15:00",
+                "day": horizon.strftime("%A"),
+            },
+            {
+                "name": "Spinning",
+                "time": "18:00",
+                "day": tomorrow.strftime("%A"),
+            },
+        ]
+    }
+    _, _, headers = load_config()
+    code = _book_account(
+        "tedde@feelgood.se",
+        "pw",
+        activities,
+        False,
+        f"1..{settings['day_offset']}",
+        settings,
+        feelgood_standin.urls,
+        headers,
+    )
+    assert code == 0
+    assert feelgood_standin.booked_by("bad") == ["tedde@feelgood.se"]
+    assert feelgood_standin.booked_by("spin") == ["tedde@feelgood.se"]
+    assert feelgood_standin.booked_by("other") == []
+
+
+def test_standin_release_and_capacity(feelgood_standin):
+    feelgood_standin.release = time.time() + 0.3
+    start = f"{datetime.date.today()} 15:00:00"
+    feelgood_standin.add_activity("1", "Badminton", start, capacity=1)
+    feelgood_standin.add_activity("2", "Badminton", start, capacity=0)
+    urls = feelgood_standin.urls
+    activities = [
+        Feelgood_Activity(
+            f"{urls['base_url']}{urls['participate']}{activity_id}",
+            "Badminton",
+            start,
+        )
+        for activity_id in ("1", "2")
+    ]
+    with requests.session() as s:
+        _login(s, urls, "tedde@feelgood.se", "pw")
+        bookings = _post_bookings(
+            False, {}, s, activities, release_time=None, retry_window=1.0
+        )
+        second = _post_bookings(
+            False, {}, s, activities[:1], release_time=None
+        )
+    results = {
+        fa.url[-1]: r.json().get("result", r.json().get("error_code"))
+        for r, fa in bookings
+    }
+    assert results == {"1": "ok", "2": "ACTIVITY_FULL"}
+    assert second[0][0].json()["error_code"] == "USER_ALREADY_BOOKED"
+    assert time.time() >= feelgood_standin.release
+
+
+def test_standin_client_login(feelgood_standin):
+    _, _, headers = load_config()
+
+    async def _login_and_logout():
+        async with Feelgood_Client(feelgood_standin.urls, headers) as client:
+            assert not await client.login("tedde@feelgood.se", "")
+            assert await client.login("tedde@feelgood.se", "pw")
+            assert await client.logout("tedde@feelgood.se")
+
+    asyncio.run(_login_and_logout())
+    assert feelgood_standin.sessions == {}
+
+
+@pytest.mark.parametrize(
+    "fallback, capacity, booked",
+    [
+        ("speculative", 1, "primary"),
+        ("speculative", 0, "alternative"),
+        ("on_full", 1, "primary"),
+        ("on_full", 0, "alternative"),
+    ],
+)
+def test_standin_alternatives(
+    tmp_path, feelgood_standin, fallback, capacity, booked
+):
+    settings = _settings(tmp_path)
+    settings["fallback"] = fallback
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    feelgood_standin.add_activity(
+        "primary", "Badminton", f"{horizon} 15:00:00", capacity=capacity
+    )
+    feelgood_standin.add_activity(
+        "alternative", "Badminton", f"{horizon} 16:00:00", capacity=1
+    )
+    activities = compile_activities(
+        {
+            "activities": [
+                {
+                    "name": "Badminton",
+                    "time": "15:00",
+                    "day": horizon.strftime("%A"),
+                    "alternatives": [{"time": "16:00"}],
+                }
+            ]
+        }
+    )
+    _, _, headers = load_config()
+    code = _book_account(
+        "tedde@feelgood.se",
+        "pw",
+        activities,
+        False,
+        settings["day_offset"],
+        settings,
+        feelgood_standin.urls,
+        headers,
+    )
+    assert code == 0
+    for activity_id in ("primary", "alternative"):
+        expected = ["tedde@feelgood.se"] if activity_id == booked else []
+        assert feelgood_standin.booked_by(activity_id) == expected
+    sent = [path for _, method, path in feelgood_standin.requests]
+    sent_alternative = any(path.endswith("/alternative") for path in sent)
+    assert sent_alternative == (fallback == "speculative" or capacity == 0)
+
+
+def test_standin_alternatives_booked_earlier(tmp_path, feelgood_standin):
+    settings = _settings(tmp_path)
+    settings["fallback"] = "speculative"
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    feelgood_standin.add_activity(
+        "primary", "Badminton", f"{horizon} 15:00:00", capacity=1
+    )
+    feelgood_standin.add_activity(
+        "alternative", "Badminton", f"{horizon} 16:00:00", capacity=1
+    )
+    activities = compile_activities(
+        {
+            "activities": [
+                {
+                    "name": "Badminton",
+                    "time": "15:00",
+                    "day": horizon.strftime("%A"),
+                    "alternatives": [{"time": "16:00"}],
+                }
+            ]
+        }
+    )
+    _, _, headers = load_config()
+    # The second run is answered USER_ALREADY_BOOKED for the primary and
+    # ok for the alternative, which has to be cancelled again
+    for _ in range(2):
+        code = _book_account(
+            "tedde@feelgood.se",
+            "pw",
+            activities,
+            False,
+            settings["day_offset"],
+            settings,
+            feelgood_standin.urls,
+            headers,
+        )
+        assert code == 0
+        assert feelgood_standin.booked_by("primary") == ["tedde@feelgood.se"]
+        assert feelgood_standin.booked_by("alternative") == []
+    sent = [path for _, method, path in feelgood_standin.requests]
+    assert sum(path.endswith("cancel/alternative/1") for path in sent) == 2
+
+
+def test_standin_alternatives_same_activity(tmp_path, feelgood_standin):
+    settings = _settings(tmp_path)
+    settings["fallback"] = "speculative"
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    feelgood_standin.add_activity(
+        "42", "Boka", f"{horizon} 14:00:00", capacity=1
+    )
+    activities = compile_activities(
+        {
+            "activities": [
+                {
+                    "name": "Boka",
+                    "time": "14:00",
+                    "day": horizon.strftime("%A"),
+                    "start_time": "14:00",
+                    "alternatives": [{"start_time": "14:30"}],
+                }
+            ]
+        }
+    )
+    _, _, headers = load_config()
+    # The second run holds the slot already, it must not be cancelled
+    for _ in range(2):
+        code = _book_account(
+            "tedde@feelgood.se",
+            "pw",
+            activities,
+            False,
+            settings["day_offset"],
+            settings,
+            feelgood_standin.urls,
+            headers,
+        )
+        assert code == 0
+        assert feelgood_standin.booked_by("42") == ["tedde@feelgood.se"]
+    sent = [path for _, method, path in feelgood_standin.requests]
+    assert not any("cancel" in path for path in sent)
+
+
+@pytest.mark.parametrize(
+    "stream_list, capacity, booked", [(False, 0, "alt"), (True, 1, "bad")]
+)
+def test_standin_client_session(
+    tmp_path, feelgood_standin, stream_list, capacity, booked
+):
+    settings = _settings(tmp_path)
+    settings["stream_list"] = stream_list
+    settings["fallback"] = "speculative"
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    tomorrow = get_date(day_offset=1)
+    feelgood_standin.add_activity(
+        "bad", "Badminton", f"{horizon} 15:00:00", capacity=capacity
+    )
+    feelgood_standin.add_activity(
+        "alt", "Badminton", f"{horizon} 16:00:00", capacity=1
+    )
+    feelgood_standin.add_activity(
+        "spin", "Spinning", f"{tomorrow} 18:00:00", capacity=1
+    )
+    activities = compile_activities(
+        {
+            "activities": [
+                {
+                    "name": "Badminton",
+                    "time": "15:00",
+                    "day": horizon.strftime("%A"),
+                    "alternatives": [{"time": "16:00"}],
+                },
+                {
+                    "name": "Spinning",
+                    "time": "18:00",
+                    "day": tomorrow.strftime("%A"),
+                },
+            ]
+        }
+    )
+    _, _, headers = load_config()
+    yml_by_date = _yml_by_date(activities, f"1..{settings['day_offset']}")
+
+    async def _book():
+        async with Feelgood_Client(feelgood_standin.urls, headers) as client:
+            assert await client.login("tedde@feelgood.se", "pw")
+            await _book_client_session(client, yml_by_date, False, settings)
+
+    asyncio.run(_book())
+    # The surplus alternative is cancelled again when the primary is free
+    for activity_id in ("bad", "alt"):
+        expected = ["tedde@feelgood.se"] if activity_id == booked else []
+        assert feelgood_standin.booked_by(activity_id) == expected
+    assert feelgood_standin.booked_by("spin") == ["tedde@feelgood.se"]
@@ -0,0 +1,121 @@
+import datetime
+import threading
+
+import requests
+
+from book_feelgood.book import Feelgood_Activity, _book_account, _login
+from book_feelgood.parse import get_date, load_config
+from book_feelgood.waitlist import Waitlist
+
+START = f"{datetime.date.today()} 15:00:00"
+
+
+def _full_activity(standin, s) -> Feelgood_Activity:
+    urls = standin.urls
+    standin.add_activity("1", "Badminton", START, capacity=1)
+    with requests.session() as other:
+        _login(other, urls, "other@feelgood.se", "pw")
+        other.post(f"{urls['base_url']}{urls['participate']}1")
+    _login(s, urls, "tedde@feelgood.se", "pw")
+    return Feelgood_Activity(
+        f"{urls['base_url']}{urls['participate']}1", "Badminton", START
+    )
+
+
+def _cancel_later(standin, delay: float = 0.2) -> threading.Timer:
+    timer = threading.Timer(
+        delay, standin._cancel, args=("other@feelgood.se", "1")
+    )
+    timer.start()
+    return timer
+
+
+def test_waitlist_books_freed_spot(feelgood_standin):
+    with requests.session() as s:
+        activity = _full_activity(feelgood_standin, s)
+        waitlist = Waitlist(s, feelgood_standin.urls, {}, "f")
+        waitlist.watch([activity])
+        _cancel_later(feelgood_standin)
+        [(r, booked)] = waitlist.run(duration=5, interval=0.05, jitter=0.5)
+    assert r.json() == {"result": "ok"}
+    assert booked == activity
+    assert waitlist.watched == []
+    assert feelgood_standin.booked_by("1") == ["tedde@feelgood.se"]
+    participates = [
+        path
+        for _, method, path in feelgood_standin.requests
+        if method == "POST" and "participate" in path
+    ]
+    # Only booked once the spot was free
+    assert len(participates) == 2
+
+
+def test_waitlist_gives_up(feelgood_standin, caplog):
+    with requests.session() as s:
+        activity = _full_activity(feelgood_standin, s)
+        waitlist = Waitlist(s, feelgood_standin.urls, {}, "f")
+        waitlist.watch([activity])
+        assert waitlist.run(duration=0.2, interval=0.05) == []
+    assert "No spot freed up" in caplog.text
+    assert feelgood_standin.booked_by("1") == ["other@feelgood.se"]
+
+
+def test_waitlist_watch(feelgood_standin):
+    urls = feelgood_standin.urls
+    url = f"{urls['base_url']}{urls['participate']}1"
+    first, second = [
+        Feelgood_Activity(url, "Badminton", START, start_time=start_time)
+        for start_time in ("15:00", "15:30")
+    ]
+    boka = Feelgood_Activity(url, "Boka", START, start_time="13:30")
+    with requests.session() as s:
+        waitlist = Waitlist(s, urls, {}, "f")
+        waitlist.watch([first, second, boka])
+    # Both are kept although they book the same remote activity
+    assert waitlist.watched == [first, second]
+
+
+def test_waitlist_conditional_fetch(feelgood_standin):
+    with requests.session() as s:
+        activity = _full_activity(feelgood_standin, s)
+        waitlist = Waitlist(s, feelgood_standin.urls, {}, "f")
+        assert waitlist._fetch(activity.date)["activities"]
+        assert waitlist._fetch(activity.date) is None
+        feelgood_standin.add_activity("2", "Spinning", START)
+        assert len(waitlist._fetch(activity.date)["activities"]) == 2
+
+
+def test_waitlist_book_account(tmp_path, feelgood_standin):
+    settings, _, headers = load_config()
+    settings["cache_dir"] = tmp_path / "cache"
+    settings["clock_samples"] = 2
+    settings["warmup_seconds"] = 0
+    settings["release_time"] = "00:00:00"
+    settings["waitlist_duration"] = 5
+    settings["waitlist_poll"] = 0.05
+    settings["logout_delay"] = [0, 0]
+    horizon = get_date(day_offset=int(settings["day_offset"]))
+    feelgood_standin.add_activity("1", "Badminton", f"{horizon} 15:00:00")
+    feelgood_standin._participate("other@feelgood.se", "1")
+    activities = {
+        "activities": [
+            {
+                "name": "Badminton",
+                "time": "15:00",
+                "day": horizon.strftime("%A"),
+            }
+        ]
+    }
+    _cancel_later(feelgood_standin, 0.5)
+    code = _book_account(
+        "tedde@feelgood.se",
+        "pw",
+        activities,
+        False,
+        settings["day_offset"],
+        settings,
+        feelgood_standin.urls,
+        headers,
+    )
+    assert code == 0
+    assert feelgood_standin.booked_by("1") == ["tedde@feelgood.se"]